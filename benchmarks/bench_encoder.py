@@ -0,0 +1,56 @@
+"""Throughput of the DNA encoder against the original per-bit implementation.
+
+Usage: python benchmarks/bench_encoder.py [packets] [packet length]
+"""
+
+import os
+import sys
+import time
+
+from marissa.dna.encoder import to_fasta
+
+conversion_table = {"00": "A", "01": "T", "10": "G", "11": "C"}
+
+
+def legacy_to_dna_sequence(item):
+    ret = ""
+
+    for byte in item:
+        bites = f"{byte:08b}"
+        ret += conversion_table[bites[0:2]]
+        ret += conversion_table[bites[2:4]]
+        ret += conversion_table[bites[4:6]]
+        ret += conversion_table[bites[6:8]]
+
+    return ret
+
+
+def legacy_to_fasta(data):
+    fasta = ""
+    for i, item in enumerate(data):
+        fasta += f">MSG.{i:0{len(str(len(data)))}}\n{legacy_to_dna_sequence(item)}\n"
+    return fasta
+
+
+def throughput(encode, data):
+    size = sum(len(item) for item in data)
+    start = time.perf_counter()
+    fasta = encode(data)
+    elapsed = time.perf_counter() - start
+    return fasta, size / elapsed / 1e6
+
+
+def main(packets=2000, length=1500):
+    data = [os.urandom(length) for _ in range(packets)]
+    legacy, legacy_speed = throughput(legacy_to_fasta, data)
+    table, table_speed = throughput(to_fasta, data)
+    assert legacy == table, "The encoders disagree"
+    print(f"{packets} packets of {length} bytes")
+    print(f"legacy encoder: {legacy_speed:10.2f} MB/s")
+    print(
+        f"table encoder:  {table_speed:10.2f} MB/s ({table_speed / legacy_speed:.0f}x)"
+    )
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:3]))
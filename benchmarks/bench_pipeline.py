@@ -0,0 +1,205 @@
+"""Time and memory of every stage of Marissa, for every distance and cluster algorithm.
+
+The captures are made by `synthetic.py`, so the clusters are compared with the
+message types with the adjusted Rand index. The results are written as JSON,
+to compare them across commits.
+
+Usage: python benchmarks/bench_pipeline.py [--packets 1000 10000] [--distances tlsh ssdeep]
+       [--clusters optics kmedoids] [--aligner native] [--output results.json]
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import resource
+import subprocess
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+from sklearn.metrics import adjusted_rand_score
+from synthetic import (
+    HEADER_LENGTH,
+    generate,
+    labels_file,
+    random_protocol,
+    write_udp_pcap,
+)
+
+from marissa import Logger, Marissa
+from marissa.registry import (
+    ALIGNMENT_ALGORITHMS,
+    CLUSTER_ALGORITHMS,
+    DISTANCE_ALGORITHMS,
+    alignment_algorithm,
+    cluster_algorithm,
+    distance_algorithm,
+)
+
+# Methods of Marissa run in order, as the stages of `execute`.
+STAGES = (
+    "load_data",
+    "remove_header",
+    "remove_duplicates",
+    "clusterize",
+    "collect_sequences",
+    "run",
+    "post_run",
+    "cleanup",
+    "save",
+)
+
+
+def measure(function, memory: bool) -> dict:
+    """Run a function, measuring its time and the peak of its allocations."""
+    if memory:
+        tracemalloc.start()
+    start, cpu = time.perf_counter(), time.process_time()
+    function()
+    result = {
+        "seconds": time.perf_counter() - start,
+        "cpu_seconds": time.process_time() - cpu,
+    }
+    if memory:
+        result["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result
+
+
+def benchmark(
+    pcap: str, distance: str, cluster: str, aligner: str, memory: bool, workdir: str
+) -> dict:
+    """Run every stage of Marissa on a capture.
+
+    Returns:
+        dict: Time and memory of every stage, and the quality of the clusters.
+    """
+    marissa = Marissa(
+        input_file=pcap,
+        output_file=os.path.join(workdir, "output.txt"),
+        header_length=HEADER_LENGTH,
+        distance_algorithm=distance_algorithm(distance),
+        cluster_algorithm=cluster_algorithm(cluster),
+        alignment_algorithm=alignment_algorithm(aligner) if aligner else None,
+    )
+    # The stages after the alignment can't run without it
+    stages = STAGES if aligner else STAGES[: STAGES.index("run")]
+    result = {
+        "distance": distance,
+        "cluster": cluster,
+        "aligner": aligner,
+        "stages": {},
+    }
+    for stage in stages:
+        result["stages"][stage] = measure(getattr(marissa, stage), memory)
+        if stage == "load_data":
+            # Set by `prepare`, which runs the first stages
+            marissa.max_length = max(marissa.df["length"])
+    result["seconds"] = sum(stage["seconds"] for stage in result["stages"].values())
+    labels = np.load(labels_file(pcap))
+    result["packets"] = len(marissa.df)
+    result["unique_payloads"] = len(marissa.unique)
+    result["clusters"] = len(marissa.clusters)
+    result["message_types"] = len(np.unique(labels))
+    result["adjusted_rand_index"] = adjusted_rand_score(
+        labels, marissa.df["cluster"].astype(str)
+    )
+    return result
+
+
+def commit() -> str:
+    """Commit of the benchmarked code, if it's in a git repository."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the stages of Marissa on synthetic captures."
+    )
+    parser.add_argument(
+        "--packets",
+        type=int,
+        nargs="+",
+        default=[1000, 10000],
+        help="Sizes of the captures.",
+    )
+    parser.add_argument("--types", type=int, default=8, help="Number of message types.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the captures.")
+    parser.add_argument(
+        "--distances",
+        nargs="+",
+        default=list(DISTANCE_ALGORITHMS),
+        choices=DISTANCE_ALGORITHMS,
+    )
+    parser.add_argument(
+        "--clusters",
+        nargs="+",
+        default=list(CLUSTER_ALGORITHMS),
+        choices=CLUSTER_ALGORITHMS,
+    )
+    parser.add_argument(
+        "--aligner",
+        default="native",
+        choices=[*ALIGNMENT_ALGORITHMS, "none"],
+        help="Alignment algorithm, or none to stop after the clustering.",
+    )
+    parser.add_argument(
+        "--no-memory",
+        action="store_true",
+        help="Don't trace the allocations, which slows down.",
+    )
+    parser.add_argument(
+        "--output", default="benchmark.json", help="The JSON file of the results."
+    )
+    args = parser.parse_args()
+
+    aligner = None if args.aligner == "none" else args.aligner
+    protocol = random_protocol(args.types, args.seed)
+    report = {
+        "commit": commit(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "types": args.types,
+        "seed": args.seed,
+        "results": [],
+    }
+    # Only the results are printed
+    Logger().logger.setLevel(logging.WARNING)
+    with tempfile.TemporaryDirectory() as workdir:
+        for n_packets in args.packets:
+            pcap = os.path.join(workdir, f"synthetic-{n_packets}.pcap")
+            payloads, labels = generate(protocol, n_packets, args.seed)
+            write_udp_pcap(pcap, payloads)
+            np.save(labels_file(pcap), labels)
+            for distance in args.distances:
+                for cluster in args.clusters:
+                    result = benchmark(
+                        pcap, distance, cluster, aligner, not args.no_memory, workdir
+                    )
+                    report["results"].append(result)
+                    print(
+                        f"{n_packets:>8} packets {distance:>8} {cluster:>20}: {result['seconds']:8.2f}s "
+                        f"{result['clusters']:>4} clusters, ARI {result['adjusted_rand_index']:.3f}"
+                    )
+    # Peak resident memory of the whole run, in KB on Linux
+    report["max_rss_kb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
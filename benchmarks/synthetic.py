@@ -0,0 +1,218 @@
+"""Deterministic generator of captures of a synthetic binary protocol.
+
+Every message type is a layout of fields, and the type of every packet is
+saved next to the capture as ground truth for the clustering.
+
+Usage: python benchmarks/synthetic.py <output.pcap> [--packets N] [--types N]
+       [--protocol protocol.json] [--seed N]
+
+A protocol file is a list of message types like:
+    {"weight": 3, "fields": [{"kind": "const", "value": "cafe"},
+                             {"kind": "counter", "width": 2},
+                             {"kind": "length", "width": 2},
+                             {"kind": "bytes", "min": 4, "max": 32}]}
+with the field kinds of `FIELD_KINDS`.
+"""
+
+import argparse
+import json
+import struct
+
+import numpy as np
+
+from marissa.pcap.Pcap import write_pcap
+
+# const: fixed value. choice: one of several values. counter: sequence number of
+# the message type. random: random bytes. length: length of the payload.
+# text and bytes: variable length ASCII letters or random bytes.
+FIELD_KINDS = ("const", "choice", "counter", "random", "length", "text", "bytes")
+# Ethernet, IPv4 and UDP headers, removed with --header-length 42.
+HEADER_LENGTH = 42
+# Shortest message of the random protocols, TLSH doesn't hash less than 50 bytes.
+MIN_MESSAGE_LENGTH = 64
+LETTERS = np.frombuffer(
+    b"abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ", dtype=np.uint8
+)
+
+
+def min_length(field: dict) -> int:
+    """Shortest value of a field."""
+    if field["kind"] == "const":
+        return len(field["value"]) // 2
+    if field["kind"] == "choice":
+        return min(len(value) // 2 for value in field["values"])
+    if field["kind"] in ("text", "bytes"):
+        return field["min"]
+    return field["width"]
+
+
+def random_protocol(n_types: int, seed: int = 0) -> list:
+    """Make up a protocol: a magic, a type byte and a length, then random fields.
+
+    The weights of the message types decrease like Zipf's law, so a few types
+    carry most of the packets. Message types shorter than `MIN_MESSAGE_LENGTH`
+    end with constant bytes, so every distance algorithm can compare them.
+
+    Args:
+        n_types (int): Number of message types.
+        seed (int, optional): Seed of the layouts. Defaults to 0.
+
+    Returns:
+        list: Message types, like the ones of a protocol file.
+    """
+    rng = np.random.default_rng(seed)
+    protocol = []
+    for message_type in range(n_types):
+        fields = [
+            {"kind": "const", "value": "4d52"},
+            {"kind": "const", "value": f"{message_type:02x}"},
+            {"kind": "length", "width": 2},
+        ]
+        for _ in range(rng.integers(2, 7)):
+            kind = rng.choice(["const", "choice", "counter", "random", "text", "bytes"])
+            width = int(rng.integers(1, 9))
+            if kind == "const":
+                fields.append({"kind": kind, "value": rng.bytes(width).hex()})
+            elif kind == "choice":
+                values = [rng.bytes(width).hex() for _ in range(rng.integers(2, 5))]
+                fields.append({"kind": kind, "values": values})
+            elif kind in ("counter", "random"):
+                fields.append({"kind": kind, "width": width})
+            else:
+                low = int(rng.integers(0, 16))
+                fields.append(
+                    {"kind": kind, "min": low, "max": low + int(rng.integers(0, 48))}
+                )
+        missing = MIN_MESSAGE_LENGTH - sum(map(min_length, fields))
+        if missing > 0:
+            fields.append({"kind": "const", "value": rng.bytes(missing).hex()})
+        protocol.append({"weight": 1 / (message_type + 1), "fields": fields})
+    return protocol
+
+
+def generate(protocol: list, n_packets: int, seed: int = 0):
+    """Generate the payloads of a capture.
+
+    Args:
+        protocol (list): Message types.
+        n_packets (int): Number of packets.
+        seed (int, optional): Seed of the packets. Defaults to 0.
+
+    Returns:
+        Tuple[List[bytes], np.ndarray]: Payloads, and the message type of every one.
+    """
+    rng = np.random.default_rng(seed)
+    weights = np.array(
+        [message_type.get("weight", 1) for message_type in protocol], dtype=float
+    )
+    labels = rng.choice(len(protocol), size=n_packets, p=weights / weights.sum())
+    counters = [0] * len(protocol)
+    payloads = []
+    for label in labels:
+        parts, length_at = [], None
+        for field in protocol[label]["fields"]:
+            kind = field["kind"]
+            if kind == "const":
+                parts.append(bytes.fromhex(field["value"]))
+            elif kind == "choice":
+                parts.append(
+                    bytes.fromhex(field["values"][rng.integers(len(field["values"]))])
+                )
+            elif kind == "counter":
+                parts.append(
+                    (counters[label] % 256 ** field["width"]).to_bytes(
+                        field["width"], "big"
+                    )
+                )
+            elif kind == "random":
+                parts.append(rng.bytes(field["width"]))
+            elif kind == "length":
+                length_at = (len(parts), field["width"])
+                parts.append(b"")
+            elif kind == "text":
+                size = rng.integers(field["min"], field["max"] + 1)
+                parts.append(LETTERS[rng.integers(len(LETTERS), size=size)].tobytes())
+            elif kind == "bytes":
+                parts.append(rng.bytes(rng.integers(field["min"], field["max"] + 1)))
+            else:
+                raise ValueError(
+                    f"Unknown field kind {kind!r}, expected one of {', '.join(FIELD_KINDS)}"
+                )
+        if length_at is not None:
+            position, width = length_at
+            length = sum(map(len, parts)) + width
+            parts[position] = (length % 256**width).to_bytes(width, "big")
+        counters[label] += 1
+        payloads.append(b"".join(parts))
+    return payloads, labels
+
+
+def udp_header(length: int) -> bytes:
+    """Ethernet, IPv4 and UDP headers of a payload of `length` bytes."""
+    ethernet = bytes.fromhex("020000000002" "020000000001" "0800")
+    ip = struct.pack(
+        ">BBHHHBBH4s4s",
+        0x45,
+        0,
+        28 + length,
+        0,
+        0,
+        64,
+        17,
+        0,
+        bytes([10, 0, 0, 1]),
+        bytes([10, 0, 0, 2]),
+    )
+    udp = struct.pack(">HHHH", 40000, 9999, 8 + length, 0)
+    return ethernet + ip + udp
+
+
+def write_udp_pcap(filename: str, payloads: list):
+    """Write the payloads as UDP packets, one millisecond apart."""
+    write_pcap(
+        filename,
+        (
+            (i / 1000, udp_header(len(payload)) + payload)
+            for i, payload in enumerate(payloads)
+        ),
+    )
+
+
+def labels_file(pcap: str) -> str:
+    return f"{pcap}.labels.npy"
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Write a capture of a synthetic protocol."
+    )
+    parser.add_argument(
+        "output", help="The pcap file to write. The labels go to <output>.labels.npy"
+    )
+    parser.add_argument("--packets", type=int, default=1000, help="Number of packets.")
+    parser.add_argument(
+        "--types", type=int, default=5, help="Number of random message types."
+    )
+    parser.add_argument(
+        "--protocol", help="JSON file with the message types, instead of random ones."
+    )
+    parser.add_argument(
+        "--seed", type=int, default=0, help="Seed of the protocol and the packets."
+    )
+    args = parser.parse_args()
+
+    if args.protocol:
+        with open(args.protocol) as f:
+            protocol = json.load(f)
+    else:
+        protocol = random_protocol(args.types, args.seed)
+    payloads, labels = generate(protocol, args.packets, args.seed)
+    write_udp_pcap(args.output, payloads)
+    np.save(labels_file(args.output), labels)
+    print(
+        f"{len(payloads)} packets of {len(protocol)} message types written to {args.output}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -45,3 +45,9 @@ class Logger(metaclass=Singleton):
 
     def info(self, message):
         self.logger.info(message)
+
+    def warning(self, message):
+        self.logger.warning(message)
+
+    def error(self, message):
+        self.logger.error(message)
@@ -1,5 +1,26 @@
-from .cluster_algorithm import *
-from .distance_metrics import *
+from marissa.lazy import attach
+
 from .Logger import Logger
-from .Marissa import Marissa
-from .pcap import *
+
+__getattr__, __dir__, __all__ = attach(
+    __name__,
+    {
+        "ClusterAlgorithm": ".cluster_algorithm",
+        "KMeansAlgorithm": ".cluster_algorithm",
+        "KMeansHierarchicalAlgorithm": ".cluster_algorithm",
+        "KMedoidsAlgorithm": ".cluster_algorithm",
+        "KMeansModelSelection": ".cluster_algorithm",
+        "OpticsAlgorithm": ".cluster_algorithm",
+        "DistanceAlgorithm": ".distance_metrics",
+        "HammingDistance": ".distance_metrics",
+        "SSDEEPDistance": ".distance_metrics",
+        "TLSHDistance": ".distance_metrics",
+        "Marissa": ".pipeline",
+        "Packet": ".pcap",
+        "PacketStore": ".pcap",
+        "Pcap": ".pcap",
+        "PcapReader": ".pcap",
+        "Profiler": ".profiling",
+    },
+)
+__all__ += ["Logger"]
@@ -0,0 +1,13 @@
+from marissa.lazy import attach
+
+__getattr__, __dir__, __all__ = attach(
+    __name__,
+    {
+        "AlignmentAlgorithm": ".alignment_algorithm",
+        "ByteAligner": ".byte_aligner",
+        "ClustalOmega": ".clustal_omega",
+        "ColumnStatistics": ".column_statistics",
+        "AlignmentJob": ".scheduler",
+        "AlignmentScheduler": ".scheduler",
+    },
+)
@@ -0,0 +1,46 @@
+from abc import ABC, abstractmethod
+from typing import List
+
+import numpy as np
+
+from marissa.alignment.scheduler import AlignmentJob
+
+
+class AlignmentAlgorithm(ABC):
+    # Whether `align` builds its guide tree from the distances between the sequences.
+    uses_distances: bool = False
+
+    @abstractmethod
+    def align(
+        self,
+        job: AlignmentJob,
+        sequences: List[bytes],
+        distances: np.ndarray = None,
+        profile: List[str] = None,
+    ):
+        """Align the payloads of a cluster.
+
+        The aligned payloads are left in the `aligned` of the job, in hexadecimal
+        with "--" for the gaps, all with the same length.
+
+        Args:
+            job (AlignmentJob): Job filled with the exit status and the alignment.
+            sequences (List[bytes]): Payloads.
+            distances (np.ndarray, optional): Condensed dissimilarity matrix of the
+                payloads, if `uses_distances`. Defaults to None.
+            profile (List[str], optional): Existing alignment the payloads are added
+                to. Its rows come first in the output. Defaults to None.
+        """
+        pass
+
+    @abstractmethod
+    def merge_alignments(self, job: AlignmentJob, alignments: List[List[str]]):
+        """Merge several alignments into one, with profile-profile alignment.
+
+        Args:
+            job (AlignmentJob): Job filled with the exit status and the alignment,
+                with the rows of every alignment in order.
+            alignments (List[List[str]]): Aligned payloads of every alignment, in
+                hexadecimal with "--" for the gaps.
+        """
+        pass
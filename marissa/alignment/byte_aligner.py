@@ -0,0 +1,207 @@
+from typing import List, Tuple
+
+import numpy as np
+
+from marissa.alignment.alignment_algorithm import AlignmentAlgorithm
+from marissa.alignment.guide_tree import upgma
+from marissa.alignment.scheduler import AlignmentJob
+
+# Value of the gaps in the aligned byte matrices.
+GAP = -1
+# Hexadecimal characters of every byte value, and of the gap last.
+HEX_TABLE = np.array(
+    [list(f"{byte:02x}".encode()) for byte in range(256)] + [list(b"--")],
+    dtype=np.uint8,
+)
+
+
+def from_hex(rows: List[str]) -> np.ndarray:
+    """Read aligned hexadecimal payloads, with "--" gaps, into a byte matrix."""
+    if not rows:
+        return np.empty((0, 0), dtype=np.int16)
+    matrix = np.array(
+        [list(bytes.fromhex(row.replace("--", "00"))) for row in rows], dtype=np.int16
+    ).reshape(len(rows), -1)
+    gaps = np.array([[row[i] == "-" for i in range(0, len(row), 2)] for row in rows])
+    matrix[gaps.reshape(matrix.shape)] = GAP
+    return matrix
+
+
+def to_hex(matrix: np.ndarray) -> List[str]:
+    """Write a byte matrix as aligned hexadecimal payloads, with "--" gaps."""
+    characters = HEX_TABLE[np.where(matrix == GAP, 256, matrix)]
+    return [row.tobytes().decode("ascii") for row in characters]
+
+
+class ByteAligner(AlignmentAlgorithm):
+    uses_distances = True
+
+    def __init__(self, match: float = 2.0, mismatch: float = -1.0, gap: float = -2.0):
+        """Progressive alignment over the bytes of the payloads.
+
+        The payloads are aligned in the order of a UPGMA guide tree built from
+        their distances, merging the profiles of the two subtrees at every node
+        with a Needleman-Wunsch alignment. The score of two columns is the
+        expected score of a byte of one against a byte of the other, so every
+        cell of the dynamic programming matrix costs a single product of the
+        byte frequencies of the profiles.
+
+        Args:
+            match (float, optional): Score of two equal bytes. Defaults to 2.
+            mismatch (float, optional): Score of two different bytes. Defaults to -1.
+            gap (float, optional): Score of a byte against a gap. Defaults to -2.
+        """
+        self.match = match
+        self.mismatch = mismatch
+        self.gap = gap
+
+    def align(
+        self,
+        job: AlignmentJob,
+        sequences: List[bytes],
+        distances: np.ndarray = None,
+        profile: List[str] = None,
+    ):
+        """Align the payloads following the guide tree of their distances.
+
+        Args:
+            job (AlignmentJob): Job filled with the exit status and the alignment.
+            sequences (List[bytes]): Payloads.
+            distances (np.ndarray, optional): Condensed dissimilarity matrix of the
+                payloads. Without it, the payloads are added one by one in order.
+                Defaults to None.
+            profile (List[str], optional): Existing alignment the payloads are added
+                to. Its rows come first in the output. Defaults to None.
+        """
+        aligned = self.progressive_alignment(sequences, distances)
+        if profile:
+            aligned = np.concatenate(self.merge(from_hex(profile), aligned))
+        job.aligned = to_hex(aligned)
+        job.returncode = 0
+
+    def merge_alignments(self, job: AlignmentJob, alignments: List[List[str]]):
+        """Merge the alignments in pairs, until only one is left."""
+        matrices = [from_hex(alignment) for alignment in alignments]
+        while len(matrices) > 1:
+            merged = [
+                np.concatenate(self.merge(a, b))
+                for a, b in zip(matrices[::2], matrices[1::2])
+            ]
+            matrices = merged + matrices[len(merged) * 2 :]
+        job.aligned = to_hex(matrices[0])
+        job.returncode = 0
+
+    def progressive_alignment(
+        self, sequences: List[bytes], distances: np.ndarray = None
+    ) -> np.ndarray:
+        """Align the payloads following the guide tree.
+
+        Args:
+            sequences (List[bytes]): Payloads.
+            distances (np.ndarray, optional): Condensed dissimilarity matrix. Defaults to None.
+
+        Returns:
+            np.ndarray: Aligned bytes of every payload, in their order, with GAP for the gaps.
+        """
+        n = len(sequences)
+        # Every node of the tree is the alignment of its payloads, and their positions
+        nodes = {
+            i: (np.frombuffer(sequence, dtype=np.uint8).astype(np.int16)[None, :], [i])
+            for i, sequence in enumerate(sequences)
+        }
+        if n < 2:
+            return nodes[0][0] if n else np.empty((0, 0), dtype=np.int16)
+        if distances is None:
+            tree = [(0 if k == 0 else n + k - 1, k + 1) for k in range(n - 1)]
+        else:
+            tree = upgma(distances)
+        for k, (a, b, *_) in enumerate(tree):
+            (rows_a, order_a), (rows_b, order_b) = nodes.pop(int(a)), nodes.pop(int(b))
+            nodes[n + k] = (
+                np.concatenate(self.merge(rows_a, rows_b)),
+                order_a + order_b,
+            )
+        rows, order = nodes.popitem()[1]
+        return rows[np.argsort(order)]
+
+    def merge(self, a: np.ndarray, b: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Align two alignments, inserting gap columns in both of them.
+
+        Args:
+            a (np.ndarray): Aligned bytes of the first alignment.
+            b (np.ndarray): Aligned bytes of the second alignment.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Both alignments, with the same columns.
+        """
+        columns_a, columns_b = self.align_profiles(a, b)
+        merged_a = np.full((len(a), len(columns_a)), GAP, dtype=np.int16)
+        merged_b = np.full((len(b), len(columns_b)), GAP, dtype=np.int16)
+        merged_a[:, columns_a >= 0] = a[:, columns_a[columns_a >= 0]]
+        merged_b[:, columns_b >= 0] = b[:, columns_b[columns_b >= 0]]
+        return merged_a, merged_b
+
+    @staticmethod
+    def frequencies(rows: np.ndarray) -> np.ndarray:
+        """Frequency of every byte value in every column of an alignment."""
+        length = rows.shape[1]
+        columns, values = np.nonzero(rows.T != GAP)[0], rows.T[rows.T != GAP]
+        counts = np.bincount(columns * 256 + values, minlength=length * 256)
+        return counts.reshape(length, 256) / len(rows)
+
+    def align_profiles(
+        self, a: np.ndarray, b: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Needleman-Wunsch alignment of the columns of two alignments.
+
+        Every row of the score matrix is filled at once: the diagonal and
+        vertical moves only depend on the previous row, and the best horizontal
+        move is a running maximum along the row.
+
+        Args:
+            a (np.ndarray): Aligned bytes of the first alignment.
+            b (np.ndarray): Aligned bytes of the second alignment.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Column of each alignment in every column
+                of the merged alignment, or -1 for the gap columns.
+        """
+        frequencies_a, frequencies_b = self.frequencies(a), self.frequencies(b)
+        occupancy_a, occupancy_b = frequencies_a.sum(axis=1), frequencies_b.sum(axis=1)
+        equal = frequencies_a @ frequencies_b.T
+        scores = self.match * equal + self.mismatch * (
+            np.outer(occupancy_a, occupancy_b) - equal
+        )
+        # Columns that are mostly gaps are cheap to align against a gap
+        gaps_a, gaps_b = self.gap * occupancy_a, self.gap * occupancy_b
+        cumulative_b = np.concatenate(([0.0], np.cumsum(gaps_b)))
+
+        length_a, length_b = len(occupancy_a), len(occupancy_b)
+        # 0: diagonal, 1: vertical (gap in b), 2: horizontal (gap in a)
+        moves = np.zeros((length_a + 1, length_b + 1), dtype=np.uint8)
+        moves[0, 1:] = 2
+        moves[1:, 0] = 1
+        previous = cumulative_b.copy()
+        for i in range(1, length_a + 1):
+            diagonal = previous[:-1] + scores[i - 1]
+            vertical = previous[1:] + gaps_a[i - 1]
+            best = np.empty(length_b + 1)
+            best[0] = previous[0] + gaps_a[i - 1]
+            best[1:] = np.maximum(diagonal, vertical)
+            moves[i, 1:] = vertical > diagonal
+            relative = best - cumulative_b
+            running = np.maximum.accumulate(relative)
+            moves[i, 1:][relative[1:] < running[1:]] = 2
+            previous = cumulative_b + running
+
+        columns_a, columns_b = [], []
+        i, j = length_a, length_b
+        while i > 0 or j > 0:
+            move = moves[i, j]
+            columns_a.append(i - 1 if move != 2 else -1)
+            columns_b.append(j - 1 if move != 1 else -1)
+            i -= move != 2
+            j -= move != 1
+        return np.array(columns_a[::-1], dtype=np.int64), np.array(
+            columns_b[::-1], dtype=np.int64
+        )
@@ -0,0 +1,196 @@
+import os
+import subprocess
+import tempfile
+import time
+from typing import List
+
+import numpy as np
+
+from marissa.alignment.alignment_algorithm import AlignmentAlgorithm
+from marissa.alignment.guide_tree import to_newick, upgma
+from marissa.alignment.scheduler import AlignmentJob
+from marissa.dna.decoder import decode_sequences, read_alignment
+from marissa.dna.encoder import sequence_names, to_aligned_dna_sequence, to_fasta
+
+# Sources of the guide tree: clustalo's own distances, or the distance matrix
+# or UPGMA tree of the digests.
+GUIDE_TREES = ("clustalo", "distances", "tree")
+
+
+class ClustalOmega(AlignmentAlgorithm):
+    def __init__(
+        self, wrap: int = None, verbose: bool = False, guide_tree: str = "clustalo"
+    ) -> None:
+        """Wrapper of the `clustalo` command.
+
+        The payloads are encoded as DNA sequences, four nucleotides per byte,
+        and the alignment is decoded back to bytes.
+
+        Args:
+            wrap (int, optional): Number of residues per line of the output.
+                Defaults to the length of the longest possible alignment.
+            verbose (bool, optional): Make clustalo report its progress. Defaults to False.
+            guide_tree (str, optional): Source of the guide tree. "distances" passes
+                the dissimilarities of the digests with `--distmat-in`, and "tree"
+                their UPGMA tree with `--guidetree-in`, so clustalo skips its own
+                distance stage. Defaults to "clustalo".
+
+        Raises:
+            ValueError: Unknown guide tree source.
+        """
+        if guide_tree not in GUIDE_TREES:
+            raise ValueError(f"Unknown guide tree: {guide_tree}")
+        self.wrap = wrap
+        self.verbose = verbose
+        self.guide_tree = guide_tree
+        self.uses_distances = guide_tree != "clustalo"
+
+    def align(
+        self,
+        job: AlignmentJob,
+        sequences: List[bytes],
+        distances: np.ndarray = None,
+        profile: List[str] = None,
+    ):
+        """Align the payloads with clustalo, streamed through the standard input.
+
+        The alignment is read from the standard output in clustal format and
+        left in the `stdout` of the job, so no intermediate files are needed
+        except for the profile and the guide tree.
+
+        Args:
+            job (AlignmentJob): Job filled with the exit status and the alignment.
+            sequences (List[bytes]): Payloads.
+            distances (np.ndarray, optional): Condensed dissimilarity matrix of the
+                payloads, for the guide tree. Defaults to None, clustalo calculates it.
+            profile (List[str], optional): Existing alignment the payloads are added
+                to. Its rows come first in the output. Defaults to None.
+        """
+        profile = profile or []
+        width = sum(map(len, sequences)) + (len(profile[0]) // 2 if profile else 0)
+        command = self.command(job, width) + ["--infile", "-"]
+        with tempfile.TemporaryDirectory() as directory:
+            if profile:
+                command += [
+                    "--profile1",
+                    self.write_profile(directory, "profile.fasta", profile),
+                ]
+            if distances is not None:
+                start = time.perf_counter()
+                command += self.write_guide_tree(directory, distances, len(profile))
+                job.timings["guide tree"] = time.perf_counter() - start
+            # The payloads are numbered after the profile rows
+            self.run(job, command, to_fasta(sequences, len(profile)))
+
+    def merge_alignments(self, job: AlignmentJob, alignments: List[List[str]]):
+        """Merge the alignments in pairs with `--profile1` and `--profile2`, until only one is left."""
+        start = time.perf_counter()
+        while len(alignments) > 1:
+            merged = []
+            for a, b in zip(alignments[::2], alignments[1::2]):
+                width = (len(a[0]) + len(b[0])) // 2
+                with tempfile.TemporaryDirectory() as directory:
+                    # The rows of the second alignment are numbered after the first
+                    command = self.command(job, width) + [
+                        "--profile1",
+                        self.write_profile(directory, "profile1.fasta", a),
+                        "--profile2",
+                        self.write_profile(directory, "profile2.fasta", b, len(a)),
+                    ]
+                    self.run(job, command)
+                if not job.ok:
+                    return
+                merged.append(job.aligned)
+            alignments = merged + alignments[len(merged) * 2 :]
+        job.timings["clustalo"] = time.perf_counter() - start
+        job.returncode = 0
+        job.aligned = alignments[0]
+
+    def command(self, job: AlignmentJob, width: int) -> List[str]:
+        """Options of clustalo, for an alignment of at most `width` bytes."""
+        command = [
+            "clustalo",
+            f"--wrap={self.wrap or max(4 * width, 1)}",
+            "--outfmt",
+            "clustal",
+            f"--threads={job.threads}",
+        ]
+        if self.verbose:
+            command.append("--verbose")
+        return command
+
+    def run(self, job: AlignmentJob, command: List[str], fasta: str = ""):
+        """Run clustalo, and decode its alignment into the job."""
+        start = time.perf_counter()
+        try:
+            process = subprocess.run(
+                command, input=fasta, capture_output=True, text=True
+            )
+        except OSError as e:
+            job.returncode = -1
+            job.stderr = str(e)
+            return
+        finally:
+            job.timings["clustalo"] = time.perf_counter() - start
+        job.returncode = process.returncode
+        job.stdout = process.stdout
+        job.stderr = process.stderr
+        if job.ok:
+            job.aligned = decode_sequences(
+                list(read_alignment(job.stdout.splitlines()).values())
+            )
+
+    @staticmethod
+    def write_profile(
+        directory: str, filename: str, aligned: List[str], start: int = 0
+    ) -> str:
+        """Write aligned payloads as an aligned FASTA file of DNA sequences.
+
+        Args:
+            directory (str): Folder of the file.
+            filename (str): Name of the file.
+            aligned (List[str]): Aligned payloads, in hexadecimal with "--" gaps.
+            start (int, optional): Number of the first sequence. Defaults to 0.
+
+        Returns:
+            str: Path of the file.
+        """
+        filename = os.path.join(directory, filename)
+        with open(filename, "w") as f:
+            for name, row in zip(sequence_names(len(aligned), start), aligned):
+                f.write(f">{name}\n{to_aligned_dna_sequence(row)}\n")
+        return filename
+
+    def write_guide_tree(
+        self, directory: str, distances: np.ndarray, start: int
+    ) -> List[str]:
+        """Write the distance matrix or guide tree of the payloads for clustalo.
+
+        Args:
+            directory (str): Folder of the file.
+            distances (np.ndarray): Condensed dissimilarity matrix.
+            start (int): Number of the first payload, after the rows of the profile.
+
+        Returns:
+            List[str]: Arguments of clustalo to read the file.
+        """
+        n = int(np.ceil(np.sqrt(2 * len(distances))))
+        # Named like the sequences of the FASTA input
+        names = sequence_names(n, start)
+        if self.guide_tree == "tree":
+            filename = os.path.join(directory, "guidetree.dnd")
+            with open(filename, "w") as f:
+                f.write(to_newick(upgma(distances), names))
+            return ["--guidetree-in", filename]
+        filename = os.path.join(directory, "distmat.txt")
+        # clustalo expects distances between 0 and 1, like its k-tuple distances
+        scale = distances.max() if len(distances) and distances.max() > 0 else 1
+        square = np.zeros((n, n))
+        square[np.triu_indices(n, 1)] = distances / scale
+        square += square.T
+        row_format = " ".join(["%.6f"] * n)
+        with open(filename, "w") as f:
+            f.write(f"{n}\n")
+            for name, row in zip(names, square):
+                f.write(f"{name} {row_format % tuple(row)}\n")
+        return ["--distmat-in", filename]
@@ -0,0 +1,61 @@
+from typing import Sequence
+
+import numpy as np
+
+GAP = ord("-")
+# Padding of the rows shorter than the alignment.
+MISSING = 0
+
+
+class ColumnStatistics:
+    def __init__(self, aligned: Sequence[str], weights: Sequence[int] = None) -> None:
+        """Statistics of every column of an alignment.
+
+        The aligned packets are loaded in a 2-D uint8 array of characters, so
+        every statistic is computed for all the columns at once. Rows shorter
+        than the alignment don't count in the columns they lack.
+
+        Args:
+            aligned (Sequence[str]): Aligned packets, as hexadecimal strings with
+                "-" for the gaps.
+            weights (Sequence[int], optional): Number of packets every row stands
+                for, such as the multiplicity of a deduplicated payload. Defaults to 1.
+        """
+        aligned = list(aligned)
+        self.rows = len(aligned)
+        width = max((len(packet) for packet in aligned), default=0)
+        padded = "".join(packet.ljust(width, chr(MISSING)) for packet in aligned)
+        self.matrix = np.frombuffer(padded.encode("ascii"), dtype=np.uint8).reshape(
+            self.rows, width
+        )
+
+        if weights is None:
+            self.weights = np.ones(self.rows, dtype=np.int64)
+        else:
+            self.weights = np.asarray(weights, dtype=np.int64)
+        # Number of packets, counting the weight of every row
+        self.total = int(self.weights.sum())
+
+        present = self.matrix != MISSING
+        gaps = self.matrix == GAP
+        # Number of packets that reach every column
+        self.counts = self.weights @ present
+        # Fraction of the packets with a gap in every column
+        self.gap_ratio = (self.weights @ gaps) / max(self.total, 1)
+
+        symbols = np.setdiff1d(np.unique(self.matrix), [MISSING, GAP])
+        # The first row stands for the columns without any character
+        symbol_counts = np.zeros((len(symbols) + 1, width), dtype=np.int64)
+        for i, symbol in enumerate(symbols, 1):
+            symbol_counts[i] = self.weights @ (self.matrix == symbol)
+        best = symbol_counts.argmax(axis=0)
+        majority_counts = symbol_counts[best, np.arange(width)]
+        # Most frequent character of every column, ignoring the gaps
+        self.majority = np.concatenate(([GAP], symbols)).astype(np.uint8)[best]
+        # Fraction of the packets with the majority character
+        self.majority_fraction = majority_counts / max(self.total, 1)
+        # Columns where every packet that reaches them has the same character
+        self.conserved = (majority_counts == self.counts) & (self.counts > 0)
+
+    def __len__(self) -> int:
+        return self.matrix.shape[1]
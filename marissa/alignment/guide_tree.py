@@ -0,0 +1,46 @@
+from typing import List
+
+import numpy as np
+from scipy.cluster.hierarchy import linkage
+
+
+def upgma(distances: np.ndarray) -> np.ndarray:
+    """Build the UPGMA guide tree of a condensed dissimilarity matrix.
+
+    Args:
+        distances (np.ndarray): Condensed dissimilarity matrix.
+
+    Returns:
+        np.ndarray: Linkage matrix, where row k joins the nodes of its first two
+            columns into node n + k, at the height of its third column.
+    """
+    return linkage(np.asarray(distances, dtype=np.float64), method="average")
+
+
+def to_newick(tree: np.ndarray, names: List[str]) -> str:
+    """Write a guide tree in Newick format.
+
+    The leaves of an UPGMA tree are at half the distance between the nodes it
+    joins, so the branch lengths are the differences of the halved heights.
+
+    Args:
+        tree (np.ndarray): Linkage matrix, from `upgma`.
+        names (List[str]): Names of the leaves.
+
+    Returns:
+        str: The tree in Newick format.
+    """
+    n = len(names)
+    if n == 1:
+        return f"{names[0]};"
+    heights = np.zeros(n + len(tree))
+    subtrees = list(names) + [None] * len(tree)
+    for k, (a, b, height, _) in enumerate(tree):
+        a, b = int(a), int(b)
+        heights[n + k] = max(height / 2, heights[a], heights[b])
+        subtrees[n + k] = (
+            f"({subtrees[a]}:{heights[n + k] - heights[a]:.6f},"
+            f"{subtrees[b]}:{heights[n + k] - heights[b]:.6f})"
+        )
+        subtrees[a] = subtrees[b] = None
+    return f"{subtrees[-1]};"
@@ -0,0 +1,94 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Hashable, List
+
+from marissa.distance_metrics.distance_matrix import resolve_n_jobs
+from marissa.Logger import Logger
+
+
+class AlignmentJob:
+    def __init__(self, cluster_id: Hashable, size: int, threads: int = 1) -> None:
+        """Result of the alignment of a cluster.
+
+        Args:
+            cluster_id (Hashable): Cluster aligned.
+            size (int): Number of sequences of the cluster.
+            threads (int, optional): Threads given to the aligner. Defaults to 1.
+        """
+        self.cluster_id = cluster_id
+        self.size = size
+        self.threads = threads
+        self.returncode: int = None
+        self.stdout = ""
+        self.stderr = ""
+        # Aligned payloads, in hexadecimal with "--" for the gaps
+        self.aligned: List[str] = []
+        self.duration = 0.0
+        # Duration of every stage of the aligner, in seconds
+        self.timings: Dict[str, float] = {}
+
+    @property
+    def ok(self) -> bool:
+        return self.returncode == 0
+
+
+class AlignmentScheduler:
+    def __init__(self, max_jobs: int = 1, threads: int = None) -> None:
+        """Run the alignment of several clusters concurrently.
+
+        The largest clusters are scheduled first, and the thread budget is split
+        between the jobs running at the same time.
+
+        Args:
+            max_jobs (int, optional): Maximum number of parallel jobs. Values lower
+                than 1 mean one per core. Defaults to 1.
+            threads (int, optional): Total number of threads. Defaults to the number of cores.
+        """
+        self.logger = Logger()
+        self.max_jobs = resolve_n_jobs(max_jobs)
+        self.threads = threads or os.cpu_count() or 1
+
+    def run(
+        self,
+        sizes: Dict[Hashable, int],
+        align: Callable[[AlignmentJob], None],
+    ) -> Dict[Hashable, AlignmentJob]:
+        """Align every cluster.
+
+        Args:
+            sizes (Dict[Hashable, int]): Number of sequences of every cluster.
+            align (Callable[[AlignmentJob], None]): Function aligning the cluster
+                of a job and filling its results.
+
+        Returns:
+            Dict[Hashable, AlignmentJob]: Job of every cluster, in the original order.
+        """
+        workers = max(1, min(self.max_jobs, len(sizes)))
+        threads = max(1, self.threads // workers)
+        jobs = {
+            cluster_id: AlignmentJob(cluster_id, size, threads)
+            for cluster_id, size in sizes.items()
+        }
+        order = sorted(jobs.values(), key=lambda job: job.size, reverse=True)
+
+        def execute(job: AlignmentJob):
+            start = time.perf_counter()
+            align(job)
+            job.duration = time.perf_counter() - start
+            if job.ok:
+                stages = "".join(
+                    f", {stage} {duration:.2f}s"
+                    for stage, duration in job.timings.items()
+                )
+                self.logger.debug(
+                    f"Aligned cluster {job.cluster_id} ({job.size} sequences) in {job.duration:.2f}s{stages}"
+                )
+            else:
+                self.logger.error(
+                    f"Alignment of cluster {job.cluster_id} failed ({job.returncode}): {job.stderr.strip()}"
+                )
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(execute, order))
+        return jobs
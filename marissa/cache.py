@@ -0,0 +1,251 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from typing import Callable, Iterable, List, Sequence
+
+import numpy as np
+
+from marissa.distance_metrics import DistanceAlgorithm
+from marissa.distance_metrics.distance_matrix import squareform
+from marissa.Logger import Logger
+
+# Default size limit of the cache, in bytes.
+DEFAULT_CACHE_SIZE = 1 << 30
+# Node segments of an algorithm are merged into one above this number.
+MAX_SEGMENTS = 16
+
+
+def payload_keys(payloads: Iterable[bytes]) -> np.ndarray:
+    """Hash every payload into a 64-bit key.
+
+    Args:
+        payloads (Iterable[bytes]): Payloads, usually without their header.
+
+    Returns:
+        np.ndarray: uint64 key of every payload.
+    """
+    return np.array(
+        [
+            int.from_bytes(hashlib.blake2b(payload, digest_size=8).digest(), "little")
+            for payload in payloads
+        ],
+        dtype=np.uint64,
+    )
+
+
+def nodes_key(nodes: Sequence) -> str:
+    """Hash a list of nodes, keeping their order."""
+    digest = hashlib.blake2b(digest_size=16)
+    for node in nodes:
+        data = node.encode() if isinstance(node, str) else bytes(node)
+        digest.update(len(data).to_bytes(4, "little"))
+        digest.update(data)
+    return digest.hexdigest()
+
+
+class DistanceCache:
+    def __init__(
+        self,
+        directory: str,
+        max_size: int = DEFAULT_CACHE_SIZE,
+        distances: bool = True,
+    ):
+        """On-disk cache of the nodes and distance matrices of the packets.
+
+        Nodes are stored by the hash of the payload they were calculated from,
+        and condensed distance matrices by the hash of their nodes, in a folder
+        for every distance algorithm, version and options. Files are
+        memory-mapped when loaded, every hit marks them as recently used, and
+        the least recently used files are deleted when the cache grows over
+        `max_size`.
+
+        Args:
+            directory (str): Folder of the cache.
+            max_size (int, optional): Size limit in bytes. Defaults to DEFAULT_CACHE_SIZE.
+            distances (bool, optional): Also cache distance matrices. Defaults to True.
+        """
+        self.logger = Logger()
+        self.directory = directory
+        self.max_size = max_size
+        self.distances = distances
+        os.makedirs(directory, exist_ok=True)
+
+    def algorithm_directory(self, algorithm: DistanceAlgorithm) -> str:
+        """Get the folder of an algorithm, removing those of its other versions."""
+        name = type(algorithm).__name__
+        options = hashlib.blake2b(
+            repr(sorted(algorithm.cache_options().items())).encode(), digest_size=4
+        ).hexdigest()
+        folder = f"{name}-{algorithm.version}-{options}"
+        for entry in os.listdir(self.directory):
+            if entry.startswith(f"{name}-") and not entry.startswith(
+                f"{name}-{algorithm.version}-"
+            ):
+                self.logger.debug(f"Removing outdated cache {entry}")
+                shutil.rmtree(os.path.join(self.directory, entry), ignore_errors=True)
+        path = os.path.join(self.directory, folder)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def nodes(
+        self,
+        algorithm: DistanceAlgorithm,
+        keys: np.ndarray,
+        payload: Callable[[int], bytes],
+        n_jobs: int = 1,
+    ) -> List:
+        """Get the node of every payload, calculating only those not cached.
+
+        Args:
+            algorithm (DistanceAlgorithm): Algorithm that calculates the nodes.
+            keys (np.ndarray): Key of every payload, from `payload_keys`.
+            payload (Callable[[int], bytes]): Get the payload of a position.
+            n_jobs (int, optional): Number of threads calculating the nodes. Defaults to 1.
+
+        Returns:
+            List: Node of every payload.
+        """
+        folder = self.algorithm_directory(algorithm)
+        nodes = np.empty(len(keys), dtype=object)
+        found = np.zeros(len(keys), dtype=bool)
+        for segment in self.segments(folder):
+            segment_keys = np.load(f"{segment}.keys.npy", mmap_mode="r")
+            if not len(segment_keys):
+                continue
+            positions = np.searchsorted(segment_keys, keys).clip(
+                max=len(segment_keys) - 1
+            )
+            hits = ~found & (segment_keys[positions] == keys)
+            if hits.any():
+                values = np.load(f"{segment}.values.npy", mmap_mode="r")
+                nodes[hits] = [value.decode() for value in values[positions[hits]]]
+                found |= hits
+                self.touch(f"{segment}.keys.npy", f"{segment}.values.npy")
+        self.logger.debug(f"Found {found.sum()} of {len(keys)} nodes in the cache")
+
+        missing = np.flatnonzero(~found)
+        if len(missing):
+            nodes[missing] = algorithm.calculate_nodes(
+                [payload(i) for i in missing], n_jobs
+            )
+            # Only digests are stored, nodes that are the payload itself are not
+            if not all(isinstance(node, str) for node in nodes[missing]):
+                return list(nodes)
+            new_keys, first = np.unique(keys[missing], return_index=True)
+            self.write_segment(
+                folder, new_keys, nodes[missing[first]].astype(str).astype(bytes)
+            )
+        return list(nodes)
+
+    def segments(self, folder: str) -> List[str]:
+        """Get the node segments of an algorithm, without their extension."""
+        return sorted(
+            os.path.join(folder, entry[: -len(".keys.npy")])
+            for entry in os.listdir(folder)
+            if entry.startswith("nodes-") and entry.endswith(".keys.npy")
+        )
+
+    def write_segment(self, folder: str, keys: np.ndarray, values: np.ndarray):
+        """Store a new node segment, merging the segments if there are too many."""
+        segments = self.segments(folder)
+        if len(segments) >= MAX_SEGMENTS:
+            keys = np.concatenate(
+                [keys, *(np.load(f"{segment}.keys.npy") for segment in segments)]
+            )
+            values = np.concatenate(
+                [values, *(np.load(f"{segment}.values.npy") for segment in segments)]
+            )
+        keys, first = np.unique(keys, return_index=True)
+        values = values[first]
+        name = os.path.join(folder, f"nodes-{nodes_key([keys.tobytes()])[:16]}")
+        self.save(f"{name}.values.npy", values)
+        self.save(f"{name}.keys.npy", keys)
+        if len(segments) >= MAX_SEGMENTS:
+            for segment in segments:
+                if segment != name:
+                    self.remove(f"{segment}.keys.npy", f"{segment}.values.npy")
+        self.evict()
+
+    def distance_matrix(
+        self,
+        algorithm: DistanceAlgorithm,
+        data: Sequence,
+        calculate: Callable[[], np.ndarray],
+        condensed: bool = False,
+    ) -> np.ndarray:
+        """Get the distance matrix of some nodes, calculating it if not cached.
+
+        Args:
+            algorithm (DistanceAlgorithm): Algorithm that compares the nodes.
+            data (Sequence): Nodes.
+            calculate (Callable[[], np.ndarray]): Calculate the condensed matrix.
+            condensed (bool, optional): Return only the upper triangle. Defaults to False.
+
+        Returns:
+            np.ndarray: Distance matrix.
+        """
+        filename = os.path.join(
+            self.algorithm_directory(algorithm), f"distances-{nodes_key(data)}.npy"
+        )
+        if os.path.isfile(filename):
+            self.logger.debug("Found the distance matrix in the cache")
+            distances = np.load(filename, mmap_mode="r")
+            self.touch(filename)
+        else:
+            distances = calculate()
+            self.save(filename, distances)
+            self.evict()
+        if condensed:
+            return distances
+        return squareform(distances, len(data), algorithm.self_distance)
+
+    def save(self, filename: str, array: np.ndarray):
+        """Write an array atomically, so readers never see a partial file."""
+        fd, temporary = tempfile.mkstemp(dir=os.path.dirname(filename), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            np.save(f, array)
+        os.replace(temporary, filename)
+
+    @staticmethod
+    def touch(*filenames: str):
+        """Mark files as recently used."""
+        for filename in filenames:
+            try:
+                os.utime(filename)
+            except FileNotFoundError:
+                pass
+
+    @staticmethod
+    def remove(*filenames: str):
+        for filename in filenames:
+            try:
+                os.remove(filename)
+            except FileNotFoundError:
+                pass
+
+    def evict(self):
+        """Delete the least recently used entries until the cache fits in its size."""
+        entries = {}
+        for root, _, files in os.walk(self.directory):
+            for filename in files:
+                path = os.path.join(root, filename)
+                # The files of a node segment are one entry
+                entry = os.path.join(root, filename.split(".")[0])
+                stat = os.stat(path)
+                size, used = entries.get(entry, (0, 0))
+                entries[entry] = (size + stat.st_size, max(used, stat.st_mtime))
+        total = sum(size for size, _ in entries.values())
+        for entry, (size, _) in sorted(entries.items(), key=lambda item: item[1][1]):
+            if total <= self.max_size:
+                break
+            self.logger.debug(f"Evicting {entry} from the cache")
+            folder, name = os.path.split(entry)
+            self.remove(
+                *(
+                    os.path.join(folder, filename)
+                    for filename in os.listdir(folder)
+                    if filename.split(".")[0] == name
+                )
+            )
+            total -= size
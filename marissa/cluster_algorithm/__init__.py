@@ -1,4 +1,13 @@
-from .cluster_algorithm import ClusterAlgorithm
-from .k_means import KMeansAlgorithm
-from .k_means_hierarchical import KMeansHierarchicalAlgorithm
-from .optics import OpticsAlgorithm
+from marissa.lazy import attach
+
+__getattr__, __dir__, __all__ = attach(
+    __name__,
+    {
+        "ClusterAlgorithm": ".cluster_algorithm",
+        "KMeansAlgorithm": ".k_means",
+        "KMeansHierarchicalAlgorithm": ".k_means_hierarchical",
+        "KMedoidsAlgorithm": ".k_medoids",
+        "KMeansModelSelection": ".model_selection",
+        "OpticsAlgorithm": ".optics",
+    },
+)
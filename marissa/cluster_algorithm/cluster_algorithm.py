@@ -1,21 +1,31 @@
 from abc import ABC, abstractmethod
-from typing import List
+from functools import cached_property
+from typing import Dict, List
 
 import numpy as np
-from matplotlib import pyplot as plt
-from matplotlib.patches import Patch
-from sklearn.manifold import TSNE
 
 from marissa.distance_metrics import DistanceAlgorithm
 from marissa.Logger import Logger
 
+# Maximum number of members of a cluster compared to find its medoid.
+MAX_MEDOID_CANDIDATES = 1000
+
 
 class ClusterAlgorithm(ABC):
-    def __init__(self, data, distance_algorithm: DistanceAlgorithm):
+    def __init__(self, data, distance_algorithm: DistanceAlgorithm, n_jobs: int = 1):
         self.logger = Logger()
         self.distance_algorithm = distance_algorithm
         self.data = data
-        self.distances = self.calculate_distance_matrix(data)
+        self.n_jobs = n_jobs
+
+    @cached_property
+    def distances(self) -> np.ndarray:
+        """Distance matrix between all data points, calculated on first use."""
+        return self.calculate_distance_matrix(self.data)
+
+    @property
+    def has_distances(self) -> bool:
+        return "distances" in self.__dict__
 
     def calculate_distance_matrix(self, data: List[str]) -> np.ndarray:
         """Calculate the distance matrix between all data points.
@@ -27,11 +37,41 @@ class ClusterAlgorithm(ABC):
             np.ndarray: Distance matrix.
         """
         self.logger.debug("Calculating distance matrix...")
-        distances = np.zeros((len(data), len(data)))
-        for i in range(len(data)):
-            for j in range(len(data)):
-                distances[i, j] = self.distance_algorithm.compare(data[i], data[j])
-        return distances
+        return self.distance_algorithm.distance_matrix(data, n_jobs=self.n_jobs)
+
+    def calculate_medoids(self, clusters: List) -> Dict:
+        """Find the medoid of every cluster.
+
+        The distance matrix is used when it's already calculated. Otherwise
+        only the distances inside every cluster are calculated, between at most
+        `MAX_MEDOID_CANDIDATES` of its members.
+
+        Args:
+            clusters (List): Cluster of every data point.
+
+        Returns:
+            Dict: Index of the data point with the lowest total dissimilarity to
+                the rest of its cluster, for every cluster.
+        """
+        members = {}
+        for i, cluster in enumerate(clusters):
+            members.setdefault(cluster, []).append(i)
+        rng = np.random.default_rng(0)
+        medoids = {}
+        for cluster, indices in members.items():
+            if self.has_distances:
+                distances = self.distances[np.ix_(indices, indices)]
+            else:
+                if len(indices) > MAX_MEDOID_CANDIDATES:
+                    indices = sorted(
+                        rng.choice(indices, MAX_MEDOID_CANDIDATES, replace=False)
+                    )
+                distances = self.calculate_distance_matrix(
+                    [self.data[i] for i in indices]
+                )
+            costs = self.distance_algorithm.to_dissimilarity(distances).sum(axis=1)
+            medoids[cluster] = indices[np.argmin(costs)]
+        return medoids
 
     @abstractmethod
     def perform_clustering(self):
@@ -39,40 +79,11 @@ class ClusterAlgorithm(ABC):
         pass
 
     def plot(self, clusters: np.ndarray) -> None:
-        """Plot the clusters in a 2D space.
+        """Plot the clusters in a 2D space. Needs the `plot` extra (matplotlib).
 
         Args:
             clusters (np.ndarray): Clusters to plot.
         """
-        tsne = TSNE(n_components=2, random_state=0)
-        points = tsne.fit_transform(self.distances)
-        # Set figure size to be large, which should fill most screens.
-        fig, ax = plt.subplots(figsize=(16, 9))  # 16x9 aspect ratio, adjust as needed
-        # Convert clusters to unique integers
-        unique_clusters = list(set(clusters))
-        cluster_colors = [unique_clusters.index(cluster) for cluster in clusters]
-
-        # Normalize the cluster colors
-        norm = plt.Normalize(min(cluster_colors), max(cluster_colors))
-
-        ax.scatter(
-            points[:, 0],
-            points[:, 1],
-            c=cluster_colors,
-            s=50,
-            cmap="viridis",
-            norm=norm,
-        )
-
-        # Create a custom legend
-        legend_elements = [
-            Patch(facecolor=plt.cm.viridis(norm(i)), label=cluster)
-            for i, cluster in enumerate(unique_clusters)
-        ]
-        fig.legend(
-            handles=legend_elements,
-            title="Clusters",
-            loc="outside upper right",
-            # ncols=3,
-        )
-        plt.show()
+        from marissa.plotting import plot_clusters
+
+        plot_clusters(self.distances, clusters)
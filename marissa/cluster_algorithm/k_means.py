@@ -1,27 +1,51 @@
 import numpy as np
-from kneed import KneeLocator
-from sklearn.cluster import KMeans
 
 from marissa.cluster_algorithm import ClusterAlgorithm
+from marissa.cluster_algorithm.model_selection import KMeansModelSelection
 from marissa.distance_metrics import DistanceAlgorithm
+from marissa.profiling import profiled
 
 
 class KMeansAlgorithm(ClusterAlgorithm):
 
-    def __init__(self, data, distance_algorithm: DistanceAlgorithm):
-        super().__init__(data, distance_algorithm)
+    def __init__(
+        self,
+        data,
+        distance_algorithm: DistanceAlgorithm,
+        n_jobs: int = 1,
+        criterion: str = "knee",
+    ):
+        """KMeans clustering with an automatic number of clusters.
+
+        Args:
+            criterion (str, optional): How to choose the number of clusters,
+                "knee" or "silhouette". Defaults to "knee".
+        """
+        super().__init__(data, distance_algorithm, n_jobs)
+        self.criterion = criterion
 
     def perform_clustering(self):
         """Perform KMeans clustering on the data."""
-        n_clusters = self.calculate_optimal_clusters(self.distances)
-        clustering = KMeans(
-            n_clusters=n_clusters, init="random", max_iter=1000, random_state=0
-        ).fit_predict(self.distances)
+        selection = self.select_clusters(self.distances)
+        # Without a knee, everything is in the same cluster
+        return selection.labels(selection.n_clusters or 1)
 
-        return clustering
+    @profiled()
+    def select_clusters(self, distances: np.ndarray) -> KMeansModelSelection:
+        """Fit KMeans for every candidate number of clusters and choose one.
+
+        Args:
+            distances (np.ndarray): Distance matrix.
+
+        Returns:
+            KMeansModelSelection: Selection with the fitted models.
+        """
+        return KMeansModelSelection(
+            max_clusters=8, criterion=self.criterion, n_jobs=self.n_jobs
+        ).fit(distances, self.distance_algorithm.to_dissimilarity(distances))
 
     def calculate_optimal_clusters(self, distances: np.ndarray) -> int:
-        """Calculate the optimal number of clusters using the knee method.
+        """Calculate the optimal number of clusters.
 
         Args:
             distances (np.ndarray): Distance matrix.
@@ -29,12 +53,4 @@ class KMeansAlgorithm(ClusterAlgorithm):
         Returns:
             int: Optimal number of clusters.
         """
-        y = []
-        max_clusters = min(9, len(distances))
-        for i in range(1, max_clusters):
-            kmeans = KMeans(n_clusters=i, init="random", max_iter=1000, random_state=0)
-            kmeans.fit(distances)
-            y.append(kmeans.inertia_)
-        x = range(1, len(y) + 1)
-        kn = KneeLocator(x, y, curve="convex", direction="decreasing")
-        return kn.knee
+        return self.select_clusters(distances).n_clusters
@@ -1,43 +1,104 @@
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
-from kneed import KneeLocator
-from sklearn.cluster import KMeans
 
 from marissa.cluster_algorithm import ClusterAlgorithm
+from marissa.cluster_algorithm.model_selection import KMeansModelSelection
 from marissa.distance_metrics import DistanceAlgorithm
+from marissa.distance_metrics.distance_matrix import resolve_n_jobs
+from marissa.profiling import profiled
 
 
 class KMeansHierarchicalAlgorithm(ClusterAlgorithm):
 
-    def __init__(self, data, distance_algorithm: DistanceAlgorithm):
-        super().__init__(data, distance_algorithm)
+    def __init__(
+        self,
+        data,
+        distance_algorithm: DistanceAlgorithm,
+        n_jobs: int = 1,
+        max_depth: int = 2,
+        min_cluster_size: int = 2,
+        criterion: str = "knee",
+    ):
+        """KMeans clustering refined recursively inside every cluster.
+
+        Every refinement works on the rows and columns of its cluster in the
+        distance matrix, so no distance is calculated twice.
+
+        Args:
+            max_depth (int, optional): Number of clustering levels. Defaults to 2.
+            min_cluster_size (int, optional): Clusters smaller than this are not
+                refined. Defaults to 2.
+            criterion (str, optional): How to choose the number of clusters,
+                "knee" or "silhouette". Defaults to "knee".
+        """
+        super().__init__(data, distance_algorithm, n_jobs)
+        self.max_depth = max_depth
+        self.min_cluster_size = min_cluster_size
+        self.criterion = criterion
 
     def perform_clustering(self):
         """Perform KMeans clustering on the data."""
-        n_clusters = self.calculate_optimal_clusters(self.distances)
-        clusters = list(range(len(self.data)))
-        clustering = KMeans(
-            n_clusters=n_clusters, init="random", max_iter=1000, random_state=0
-        ).fit_predict(self.distances)
-
-        for i in range(0, n_clusters):
-            # Get the indices of the data points that belong to the current cluster
-            cluster_indices = [j for j in range(len(clustering)) if clustering[j] == i]
-            # Get the data points that belong to the current cluster
-            cluster = [self.data[j] for j in cluster_indices]
-            cluster_distances = self.calculate_distance_matrix(cluster)
-            n_sub_clusters = self.calculate_optimal_clusters(cluster_distances)
-            if n_sub_clusters is None:
-                continue
-            sub_clustering = KMeans(
-                n_clusters=n_sub_clusters, init="random", max_iter=1000, random_state=0
-            ).fit_predict(cluster_distances)
-            # Update the clustering with the sub-clustering
-            for j in range(len(cluster_indices)):
-                clusters[cluster_indices[j]] = f"{i}s{sub_clustering[j]}"
-        return clusters
+        clusters = np.empty(len(self.data), dtype=object)
+        indices = np.arange(len(self.data))
+        # The top level is always clustered, even if no knee is found
+        selection = self.select_clusters(self.distances, self.n_jobs)
+        n_clusters = selection.n_clusters or 1
+        clustering = selection.labels(n_clusters)
+        children = [(indices[clustering == i], str(i)) for i in range(n_clusters)]
+        # The refinements of every first level cluster are independent
+        with ThreadPoolExecutor(max_workers=resolve_n_jobs(self.n_jobs)) as executor:
+            for child, labels in zip(
+                children,
+                executor.map(lambda child: self.refine(*child, depth=2), children),
+            ):
+                clusters[child[0]] = labels
+        return list(clusters)
+
+    def refine(self, indices: np.ndarray, label: str, depth: int) -> np.ndarray:
+        """Split a cluster recursively.
+
+        Args:
+            indices (np.ndarray): Indices of the data points of the cluster.
+            label (str): Label of the cluster.
+            depth (int): Level of the split.
+
+        Returns:
+            np.ndarray: Label of every data point of the cluster.
+        """
+        labels = np.full(len(indices), label, dtype=object)
+        if depth > self.max_depth or len(indices) < self.min_cluster_size:
+            return labels
+        distances = self.distances[np.ix_(indices, indices)]
+        selection = self.select_clusters(distances)
+        n_clusters = selection.n_clusters
+        if n_clusters is None:
+            return labels
+        clustering = selection.labels()
+        for i in range(n_clusters):
+            members = clustering == i
+            labels[members] = self.refine(indices[members], f"{label}s{i}", depth + 1)
+        return labels
+
+    @profiled()
+    def select_clusters(
+        self, distances: np.ndarray, n_jobs: int = 1
+    ) -> KMeansModelSelection:
+        """Fit KMeans for every candidate number of clusters and choose one.
+
+        Args:
+            distances (np.ndarray): Distance matrix.
+            n_jobs (int, optional): Number of candidates fitted in parallel. Defaults to 1.
+
+        Returns:
+            KMeansModelSelection: Selection with the fitted models.
+        """
+        return KMeansModelSelection(
+            max_clusters=9, criterion=self.criterion, n_jobs=n_jobs
+        ).fit(distances, self.distance_algorithm.to_dissimilarity(distances))
 
     def calculate_optimal_clusters(self, distances: np.ndarray) -> int:
-        """Calculate the optimal number of clusters using the knee method.
+        """Calculate the optimal number of clusters.
 
         Args:
             distances (np.ndarray): Distance matrix.
@@ -45,12 +106,4 @@ class KMeansHierarchicalAlgorithm(ClusterAlgorithm):
         Returns:
             int: Optimal number of clusters.
         """
-        y = []
-        max_clusters = min(10, len(distances))
-        for i in range(1, max_clusters):
-            kmeans = KMeans(n_clusters=i, init="random", max_iter=1000, random_state=0)
-            kmeans.fit(distances)
-            y.append(kmeans.inertia_)
-        x = range(1, len(y) + 1)
-        kn = KneeLocator(x, y, curve="convex", direction="decreasing")
-        return kn.knee
+        return self.select_clusters(distances).n_clusters
@@ -0,0 +1,194 @@
+from typing import Dict, List
+
+import numpy as np
+from sklearn.metrics import silhouette_score
+
+from marissa.cluster_algorithm import ClusterAlgorithm
+from marissa.distance_metrics import DistanceAlgorithm
+
+# Number of data points compared to the medoids at once.
+ASSIGN_BATCH_SIZE = 10_000
+
+
+class KMedoidsAlgorithm(ClusterAlgorithm):
+
+    def __init__(
+        self,
+        data,
+        distance_algorithm: DistanceAlgorithm,
+        n_jobs: int = 1,
+        n_clusters: int = None,
+        max_clusters: int = 8,
+        sample_size: int = 250,
+        n_draws: int = 5,
+        max_iter: int = 100,
+        random_state: int = 0,
+    ):
+        """CLARA k-medoids clustering on the distances between the data points.
+
+        The medoids are searched with PAM on a few random samples of the data,
+        so only the distances inside every sample are calculated. Every data
+        point is then compared to the medoids alone, and the medoids of the
+        sample with the lowest total dissimilarity are kept.
+
+        Args:
+            n_clusters (int, optional): Number of clusters. Defaults to the one with
+                the best silhouette score on the first sample.
+            max_clusters (int, optional): Largest number of clusters tried. Defaults to 8.
+            sample_size (int, optional): Number of data points of every sample. Defaults to 250.
+            n_draws (int, optional): Number of samples. Defaults to 5.
+            max_iter (int, optional): Maximum number of swaps of PAM. Defaults to 100.
+            random_state (int, optional): Seed of the samples. Defaults to 0.
+        """
+        super().__init__(data, distance_algorithm, n_jobs)
+        self.n_clusters = n_clusters
+        self.max_clusters = max_clusters
+        self.sample_size = sample_size
+        self.n_draws = n_draws
+        self.max_iter = max_iter
+        self.random_state = random_state
+        self.medoid_indices: np.ndarray = None
+
+    def perform_clustering(self):
+        """Perform k-medoids clustering on the data."""
+        n = len(self.data)
+        rng = np.random.default_rng(self.random_state)
+        # With a sample holding all the data, one draw is already exact
+        n_draws = self.n_draws if n > self.sample_size else 1
+        n_clusters = self.n_clusters
+        best_cost, best_labels = np.inf, None
+        self.medoid_indices = None
+        for _ in range(n_draws):
+            sample = self.draw_sample(rng)
+            dissimilarities = self.distance_algorithm.to_dissimilarity(
+                self.distance_algorithm.distance_matrix(
+                    [self.data[i] for i in sample], n_jobs=self.n_jobs
+                )
+            )
+            if n_clusters is None:
+                n_clusters = self.select_clusters(dissimilarities)
+                self.logger.debug(f"k-medoids with {n_clusters} clusters")
+            medoids = sample[self.pam(dissimilarities, n_clusters)]
+            labels, cost = self.assign(medoids)
+            if cost < best_cost:
+                best_cost, best_labels = cost, labels
+                self.medoid_indices = medoids
+        return best_labels
+
+    def draw_sample(self, rng: np.random.Generator) -> np.ndarray:
+        """Draw a sample of the data, always keeping the best medoids found."""
+        n = len(self.data)
+        if n <= self.sample_size:
+            return np.arange(n)
+        kept = self.medoid_indices if self.medoid_indices is not None else []
+        others = np.setdiff1d(np.arange(n), kept)
+        drawn = rng.choice(others, self.sample_size - len(kept), replace=False)
+        return np.sort(np.concatenate([kept, drawn]).astype(int))
+
+    def select_clusters(self, dissimilarities: np.ndarray) -> int:
+        """Choose the number of clusters with the best silhouette score.
+
+        Args:
+            dissimilarities (np.ndarray): Dissimilarity matrix of a sample.
+
+        Returns:
+            int: Number of clusters, 1 if no split scores above 0.
+        """
+        best_k, best_score = 1, 0.0
+        for k in range(2, min(self.max_clusters, len(dissimilarities) - 1) + 1):
+            medoids = self.pam(dissimilarities, k)
+            labels = dissimilarities[:, medoids].argmin(axis=1)
+            if len(np.unique(labels)) < 2:
+                continue
+            score = silhouette_score(dissimilarities, labels, metric="precomputed")
+            if score > best_score:
+                best_k, best_score = k, score
+        return best_k
+
+    def pam(self, dissimilarities: np.ndarray, n_clusters: int) -> np.ndarray:
+        """Find the medoids of a dissimilarity matrix with PAM.
+
+        The greedy BUILD is followed by the best swap of every iteration, where
+        the change of cost of all the swaps is evaluated at once as in FastPAM1.
+
+        Args:
+            dissimilarities (np.ndarray): Dissimilarity matrix.
+            n_clusters (int): Number of medoids.
+
+        Returns:
+            np.ndarray: Indices of the medoids in the matrix.
+        """
+        d = np.asarray(dissimilarities, dtype=np.float64)
+        n_clusters = min(n_clusters, len(d))
+        # BUILD: add the point that reduces the cost the most, one at a time
+        medoids = [int(d.sum(axis=1).argmin())]
+        nearest = d[medoids[0]].copy()
+        for _ in range(1, n_clusters):
+            gains = np.maximum(nearest[None, :] - d, 0).sum(axis=1)
+            gains[medoids] = -1
+            medoids.append(int(gains.argmax()))
+            nearest = np.minimum(nearest, d[medoids[-1]])
+        medoids = np.array(medoids)
+        if n_clusters == 1:
+            return medoids
+
+        rows = np.arange(len(d))
+        for _ in range(self.max_iter):
+            to_medoids = d[:, medoids]
+            order = np.argsort(to_medoids, axis=1)
+            closest = order[:, 0]
+            near = to_medoids[rows, closest]
+            second = to_medoids[rows, order[:, 1]]
+            # Change of cost of replacing the medoid m with the point x:
+            # every point gains if x is closer than its medoid, and the points
+            # of m move to x or to their second nearest medoid.
+            common = np.minimum(d - near[None, :], 0).sum(axis=1)
+            removal = np.minimum(d, second[None, :]) - np.minimum(d, near[None, :])
+            owners = np.zeros((len(d), n_clusters))
+            owners[rows, closest] = 1
+            delta = common[:, None] + removal @ owners
+            delta[medoids] = 0
+            x, m = np.unravel_index(delta.argmin(), delta.shape)
+            if delta[x, m] >= -1e-9:
+                break
+            medoids[m] = x
+        return medoids
+
+    def assign(self, medoids: np.ndarray):
+        """Assign every data point to its nearest medoid, in batches.
+
+        Args:
+            medoids (np.ndarray): Indices of the medoids.
+
+        Returns:
+            Tuple[np.ndarray, float]: Cluster of every data point and the total
+                dissimilarity to the medoids.
+        """
+        medoid_nodes = [self.data[i] for i in medoids]
+        labels = np.empty(len(self.data), dtype=int)
+        cost = 0.0
+        for start in range(0, len(self.data), ASSIGN_BATCH_SIZE):
+            dissimilarities = self.distance_algorithm.to_dissimilarity(
+                self.distance_algorithm.cross_distance_matrix(
+                    self.data[start : start + ASSIGN_BATCH_SIZE], medoid_nodes
+                )
+            )
+            nearest = dissimilarities.argmin(axis=1)
+            labels[start : start + len(nearest)] = nearest
+            cost += dissimilarities[np.arange(len(nearest)), nearest].sum()
+        # The medoids are always in their own cluster, even with ties
+        labels[medoids] = np.arange(len(medoids))
+        return labels, cost
+
+    def calculate_medoids(self, clusters: List) -> Dict:
+        """Get the medoids found by the clustering.
+
+        Args:
+            clusters (List): Cluster of every data point.
+
+        Returns:
+            Dict: Index of the medoid of every cluster.
+        """
+        if self.medoid_indices is None:
+            return super().calculate_medoids(clusters)
+        return {clusters[i]: int(i) for i in self.medoid_indices}
@@ -0,0 +1,116 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict
+
+import numpy as np
+from kneed import KneeLocator
+from sklearn.cluster import KMeans, MiniBatchKMeans
+from sklearn.metrics import silhouette_score
+
+from marissa.distance_metrics.distance_matrix import resolve_n_jobs
+
+# Inputs with more rows than this are clustered with MiniBatchKMeans.
+MINIBATCH_THRESHOLD = 10_000
+# Random initializations of every candidate, the best one is kept.
+N_INIT = 10
+
+
+class KMeansModelSelection:
+    def __init__(
+        self,
+        max_clusters: int = 8,
+        criterion: str = "knee",
+        n_jobs: int = 1,
+        minibatch_threshold: int = MINIBATCH_THRESHOLD,
+    ):
+        """Choose the number of clusters of KMeans.
+
+        A model is fitted for every candidate number of clusters and the one
+        chosen is kept, so it doesn't have to be fitted again. Every candidate
+        is fitted from the same seeded initializations, so the number of jobs
+        only changes how many are fitted at once, not the result.
+
+        Args:
+            max_clusters (int, optional): Largest number of clusters tried. Defaults to 8.
+            criterion (str, optional): "knee" of the inertia curve or best
+                "silhouette" over the dissimilarities. Defaults to "knee".
+            n_jobs (int, optional): Number of candidates fitted in parallel. Defaults to 1.
+            minibatch_threshold (int, optional): Use MiniBatchKMeans on inputs with
+                more rows than this. Defaults to MINIBATCH_THRESHOLD.
+        """
+        if criterion not in ("knee", "silhouette"):
+            raise ValueError(f"Unknown criterion: {criterion}")
+        self.max_clusters = max_clusters
+        self.criterion = criterion
+        self.n_jobs = resolve_n_jobs(n_jobs)
+        self.minibatch_threshold = minibatch_threshold
+        self.models: Dict[int, KMeans] = {}
+        self.n_clusters: int = None
+
+    def fit(
+        self, features: np.ndarray, dissimilarities: np.ndarray = None
+    ) -> "KMeansModelSelection":
+        """Fit the candidates and choose the number of clusters.
+
+        Args:
+            features (np.ndarray): Data clustered.
+            dissimilarities (np.ndarray, optional): Pairwise dissimilarities of the
+                data, required by the silhouette criterion. Defaults to None.
+
+        Returns:
+            KMeansModelSelection: The fitted selection. `n_clusters` is None if
+                no number of clusters stands out.
+        """
+        self.n_samples = len(features)
+        candidates = range(1, min(self.max_clusters, len(features) - 1) + 1)
+        if self.n_jobs == 1:
+            self.models = {k: self.fit_model(features, k) for k in candidates}
+        else:
+            with ThreadPoolExecutor(max_workers=self.n_jobs) as executor:
+                models = executor.map(lambda k: self.fit_model(features, k), candidates)
+                self.models = dict(zip(candidates, models))
+
+        if not self.models:
+            self.n_clusters = None
+        elif self.criterion == "knee":
+            self.n_clusters = self.knee()
+        else:
+            self.n_clusters = self.best_silhouette(dissimilarities)
+        return self
+
+    def fit_model(self, features: np.ndarray, n_clusters: int) -> KMeans:
+        if len(features) > self.minibatch_threshold:
+            model = MiniBatchKMeans(
+                n_clusters=n_clusters, init="random", n_init=N_INIT, random_state=0
+            )
+        else:
+            model = KMeans(
+                n_clusters=n_clusters,
+                init="random",
+                n_init=N_INIT,
+                max_iter=1000,
+                random_state=0,
+            )
+        return model.fit(features)
+
+    def knee(self) -> int:
+        y = [model.inertia_ for model in self.models.values()]
+        x = range(1, len(y) + 1)
+        kn = KneeLocator(x, y, curve="convex", direction="decreasing")
+        return kn.knee
+
+    def best_silhouette(self, dissimilarities: np.ndarray) -> int:
+        scores = {
+            k: silhouette_score(dissimilarities, model.labels_, metric="precomputed")
+            for k, model in self.models.items()
+            if len(np.unique(model.labels_)) > 1
+        }
+        if not scores or max(scores.values()) <= 0:
+            return None
+        return max(scores, key=scores.get)
+
+    def labels(self, n_clusters: int = None) -> np.ndarray:
+        """Get the clusters of the model with the chosen, or given, number of clusters."""
+        n_clusters = n_clusters or self.n_clusters
+        if n_clusters not in self.models:
+            return np.zeros(self.n_samples, dtype=int)
+        return self.models[n_clusters].labels_
@@ -6,11 +6,41 @@ from marissa.distance_metrics import DistanceAlgorithm
 
 class OpticsAlgorithm(ClusterAlgorithm):
 
-    def __init__(self, data, distance_algorithm: DistanceAlgorithm):
-        super().__init__(data, distance_algorithm)
+    def __init__(
+        self,
+        data,
+        distance_algorithm: DistanceAlgorithm,
+        n_jobs: int = 1,
+        n_neighbors: int = None,
+        min_samples: int = 5,
+    ):
+        """OPTICS clustering over the dissimilarities between the data points.
+
+        Args:
+            n_neighbors (int, optional): Build a sparse graph with this number of
+                nearest neighbors of every data point instead of the full distance
+                matrix. Defaults to None.
+            min_samples (int, optional): Number of neighbors of a core point. Defaults to 5.
+        """
+        super().__init__(data, distance_algorithm, n_jobs)
+        self.n_neighbors = n_neighbors
+        self.min_samples = min_samples
 
     def perform_clustering(self):
         """Perform OPTICS clustering on the data."""
-        clustering = OPTICS().fit_predict(self.distances)
+        # OPTICS needs at least two samples per core point
+        min_samples = max(2, min(self.min_samples, len(self.data)))
+        if self.n_neighbors is None:
+            distances = self.distance_algorithm.to_dissimilarity(self.distances)
+        else:
+            self.logger.debug(
+                f"Calculating the {self.n_neighbors} nearest neighbors graph..."
+            )
+            distances = self.distance_algorithm.neighbor_graph(
+                self.data, max(self.n_neighbors, min_samples), n_jobs=self.n_jobs
+            )
+        clustering = OPTICS(metric="precomputed", min_samples=min_samples).fit_predict(
+            distances
+        )
 
         return clustering
@@ -1,4 +1,11 @@
-from .distance_metrics import DistanceAlgorithm
-from .hamming_distance import HammingDistance
-from .ssdeep_distance import SSDEEPDistance
-from .tlsh_distance import TLSHDistance
+from marissa.lazy import attach
+
+__getattr__, __dir__, __all__ = attach(
+    __name__,
+    {
+        "DistanceAlgorithm": ".distance_metrics",
+        "HammingDistance": ".hamming_distance",
+        "SSDEEPDistance": ".ssdeep_distance",
+        "TLSHDistance": ".tlsh_distance",
+    },
+)
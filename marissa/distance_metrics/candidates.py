@@ -0,0 +1,46 @@
+from typing import Hashable, Iterable, Optional, Tuple
+
+import numpy as np
+
+from marissa.distance_metrics.distance_matrix import condensed_size
+
+# Above this fraction of all the pairs, comparing every pair is cheaper.
+MAX_CANDIDATE_FRACTION = 0.5
+
+
+def shared_key_pairs(
+    keys: Iterable[Iterable[Hashable]], n: int
+) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """Find the pairs of data points that share at least one index key.
+
+    Args:
+        keys (Iterable[Iterable[Hashable]]): Index keys of every data point.
+        n (int): Number of data points.
+
+    Returns:
+        Optional[Tuple[np.ndarray, np.ndarray]]: Rows and columns of the pairs,
+            with every row lower than its column, or None if they are so many
+            that every pair should be compared.
+    """
+    buckets = {}
+    for i, item_keys in enumerate(keys):
+        for key in set(item_keys):
+            buckets.setdefault(key, []).append(i)
+
+    limit = MAX_CANDIDATE_FRACTION * condensed_size(n)
+    codes, total = [], 0
+    for members in buckets.values():
+        if len(members) < 2:
+            continue
+        # Members are added in increasing order, so rows are below columns
+        members = np.asarray(members, dtype=np.int64)
+        rows, columns = np.triu_indices(len(members), 1)
+        codes.append(members[rows] * n + members[columns])
+        total += len(rows)
+        if total > 2 * limit:
+            # Even with repeated pairs, the buckets cover most of the matrix
+            return None
+    codes = np.unique(np.concatenate(codes)) if codes else np.empty(0, np.int64)
+    if len(codes) > limit:
+        return None
+    return codes // n, codes % n
@@ -0,0 +1,386 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, List, Sequence, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from marissa.Logger import Logger
+from marissa.profiling import Profiler
+
+# Below this number of pairs the cost of spawning workers outweighs the gain.
+MIN_PARALLEL_PAIRS = 10_000
+# Number of row blocks handed to each worker, so slow blocks can be balanced.
+BLOCKS_PER_WORKER = 4
+# Below this number of payloads hashing them in worker processes doesn't pay off.
+MIN_PARALLEL_NODES = 50_000
+# Number of payloads hashed by every task of `calculate_nodes`.
+NODES_CHUNK_SIZE = 4096
+# Maximum number of distances held at once while searching the nearest neighbors.
+NEIGHBOR_BLOCK_SIZE = 1 << 22
+
+_worker_state = {}
+
+
+def resolve_n_jobs(n_jobs: int) -> int:
+    """Resolve the number of workers to use.
+
+    Args:
+        n_jobs (int): Requested number of workers. `None` or values lower than 1
+            mean all the available cores.
+
+    Returns:
+        int: Number of workers.
+    """
+    if n_jobs is None or n_jobs < 1:
+        return os.cpu_count() or 1
+    return n_jobs
+
+
+def condensed_size(n: int) -> int:
+    """Number of entries of the condensed form of an n x n matrix."""
+    return n * (n - 1) // 2
+
+
+def row_offset(n: int, i: int) -> int:
+    """Position in the condensed matrix of the pair (i, i + 1)."""
+    return i * n - i * (i + 1) // 2
+
+
+def row_blocks(n: int, n_blocks: int) -> List[Tuple[int, int]]:
+    """Split the rows of the upper triangle in blocks with a similar number of pairs.
+
+    Args:
+        n (int): Number of rows.
+        n_blocks (int): Number of blocks wanted.
+
+    Returns:
+        List[Tuple[int, int]]: `(start, stop)` row ranges.
+    """
+    total = condensed_size(n)
+    if total == 0:
+        return [(0, n)]
+    n_blocks = max(1, min(n_blocks, n - 1))
+    offsets = np.array([row_offset(n, i) for i in range(n + 1)])
+    targets = np.linspace(0, total, n_blocks + 1)[1:-1]
+    bounds = [0, *np.searchsorted(offsets, targets).tolist(), n]
+    return [(start, stop) for start, stop in zip(bounds, bounds[1:]) if start < stop]
+
+
+def squareform(condensed: np.ndarray, n: int, diagonal: float = 0.0) -> np.ndarray:
+    """Expand a condensed distance matrix into its square form.
+
+    Args:
+        condensed (np.ndarray): Upper triangle of the matrix, row by row.
+        n (int): Number of data points.
+        diagonal (float, optional): Value of the diagonal. Defaults to 0.0.
+
+    Returns:
+        np.ndarray: Symmetric n x n matrix.
+    """
+    square = np.empty((n, n), dtype=condensed.dtype)
+    rows, cols = np.triu_indices(n, 1)
+    square[rows, cols] = condensed
+    square[cols, rows] = condensed
+    np.fill_diagonal(square, diagonal)
+    return square
+
+
+def compute_rows(
+    distance_algorithm: Any, data: Sequence, start: int, stop: int
+) -> np.ndarray:
+    """Compare the rows `start` to `stop` with every following data point.
+
+    Args:
+        distance_algorithm (DistanceAlgorithm): Algorithm used to compare.
+        data (Sequence): Data points.
+        start (int): First row.
+        stop (int): Row after the last one.
+
+    Returns:
+        np.ndarray: Condensed distances of the rows.
+    """
+    n = len(data)
+    distances = np.empty(row_offset(n, stop) - row_offset(n, start))
+    k = 0
+    for i in range(start, stop):
+        a = data[i]
+        for j in range(i + 1, n):
+            distances[k] = distance_algorithm.compare(a, data[j])
+            k += 1
+    return distances
+
+
+def compute_pairs(
+    distance_algorithm: Any, data: Sequence, rows: np.ndarray, columns: np.ndarray
+) -> np.ndarray:
+    """Compare only the given pairs of data points.
+
+    Args:
+        distance_algorithm (DistanceAlgorithm): Algorithm used to compare.
+        data (Sequence): Data points.
+        rows (np.ndarray): First data point of every pair.
+        columns (np.ndarray): Second data point of every pair.
+
+    Returns:
+        np.ndarray: Distance of every pair.
+    """
+    return np.fromiter(
+        (
+            distance_algorithm.compare(data[i], data[j])
+            for i, j in zip(rows.tolist(), columns.tolist())
+        ),
+        dtype=np.float64,
+        count=len(rows),
+    )
+
+
+def _init_worker(distance_algorithm: Any, data: Sequence):
+    _worker_state["distance_algorithm"] = distance_algorithm
+    _worker_state["data"] = data
+
+
+def _compute_rows_in_worker(block: Tuple[int, int]) -> np.ndarray:
+    return compute_rows(
+        _worker_state["distance_algorithm"], _worker_state["data"], *block
+    )
+
+
+def _calculate_nodes_in_worker(payloads: List[bytes]) -> list:
+    return list(map(_worker_state["distance_algorithm"].calculate_node, payloads))
+
+
+def _compute_pairs_in_worker(pairs: Tuple[np.ndarray, np.ndarray]) -> np.ndarray:
+    return compute_pairs(
+        _worker_state["distance_algorithm"], _worker_state["data"], *pairs
+    )
+
+
+def calculate_nodes(
+    distance_algorithm: Any, payloads: Sequence, n_jobs: int = 1
+) -> list:
+    """Calculate the node of every payload.
+
+    The hashing libraries hold the GIL, so threads would hash one payload at a
+    time. Payloads are hashed in a plain loop, or in chunks split between a
+    pool of processes when `n_jobs` is not 1 and there are many of them.
+
+    Args:
+        distance_algorithm (DistanceAlgorithm): Algorithm calculating the nodes.
+        payloads (Sequence): Payloads.
+        n_jobs (int, optional): Number of worker processes. Defaults to 1.
+
+    Returns:
+        list: Node of every payload.
+    """
+    n_jobs = resolve_n_jobs(n_jobs)
+    if n_jobs == 1 or len(payloads) < MIN_PARALLEL_NODES:
+        return list(map(distance_algorithm.calculate_node, payloads))
+    # Payloads can be views of the capture, which can't be sent to the workers
+    chunks = [
+        [bytes(payload) for payload in payloads[start : start + NODES_CHUNK_SIZE]]
+        for start in range(0, len(payloads), NODES_CHUNK_SIZE)
+    ]
+    with ProcessPoolExecutor(
+        max_workers=n_jobs,
+        initializer=_init_worker,
+        initargs=(distance_algorithm, []),
+    ) as executor:
+        return [
+            node
+            for chunk in executor.map(_calculate_nodes_in_worker, chunks)
+            for node in chunk
+        ]
+
+
+def calculate_distance_matrix(
+    distance_algorithm: Any,
+    data: Sequence,
+    n_jobs: int = 1,
+    condensed: bool = False,
+) -> np.ndarray:
+    """Calculate the distance matrix between all data points.
+
+    Only the upper triangle is compared, since every distance algorithm is
+    symmetric, and the diagonal is filled with the distance of a node to itself.
+    Row blocks are split between a pool of processes when `n_jobs` is not 1.
+    If the algorithm finds candidate pairs, only those are compared and the rest
+    get its `unrelated_distance`.
+
+    Args:
+        distance_algorithm (DistanceAlgorithm): Algorithm used to compare.
+        data (Sequence): Data points.
+        n_jobs (int, optional): Number of worker processes. Defaults to 1.
+        condensed (bool, optional): Return the condensed upper triangle instead
+            of the square matrix. Defaults to False.
+
+    Returns:
+        np.ndarray: Distance matrix.
+    """
+    n = len(data)
+    n_jobs = resolve_n_jobs(n_jobs)
+    pairs = distance_algorithm.candidate_pairs(data)
+    Profiler().count(
+        "pairs compared", condensed_size(n) if pairs is None else len(pairs[0])
+    )
+    if pairs is not None:
+        Logger().debug(
+            f"Comparing {len(pairs[0])} candidate pairs of {condensed_size(n)}"
+        )
+        distances = calculate_candidate_distances(
+            distance_algorithm, data, pairs, n_jobs
+        )
+    elif n_jobs == 1 or condensed_size(n) < MIN_PARALLEL_PAIRS:
+        distances = compute_rows(distance_algorithm, data, 0, n)
+    else:
+        blocks = row_blocks(n, n_jobs * BLOCKS_PER_WORKER)
+        with ProcessPoolExecutor(
+            max_workers=n_jobs,
+            initializer=_init_worker,
+            initargs=(distance_algorithm, list(data)),
+        ) as executor:
+            distances = np.concatenate(
+                list(executor.map(_compute_rows_in_worker, blocks))
+            )
+    if condensed:
+        return distances
+    return squareform(distances, n, distance_algorithm.self_distance)
+
+
+def calculate_candidate_distances(
+    distance_algorithm: Any,
+    data: Sequence,
+    pairs: Tuple[np.ndarray, np.ndarray],
+    n_jobs: int = 1,
+) -> np.ndarray:
+    """Calculate a condensed distance matrix comparing only the candidate pairs.
+
+    Args:
+        distance_algorithm (DistanceAlgorithm): Algorithm used to compare.
+        data (Sequence): Data points.
+        pairs (Tuple[np.ndarray, np.ndarray]): Rows and columns of the pairs, with
+            every row lower than its column.
+        n_jobs (int, optional): Number of worker processes. Defaults to 1.
+
+    Returns:
+        np.ndarray: Condensed distances, `unrelated_distance` for the other pairs.
+    """
+    n = len(data)
+    rows, columns = pairs
+    distances = np.full(condensed_size(n), distance_algorithm.unrelated_distance)
+    positions = row_offset(n, rows) + columns - rows - 1
+    if n_jobs == 1 or len(rows) < MIN_PARALLEL_PAIRS:
+        distances[positions] = compute_pairs(distance_algorithm, data, rows, columns)
+        return distances
+    chunks = np.array_split(np.arange(len(rows)), n_jobs * BLOCKS_PER_WORKER)
+    with ProcessPoolExecutor(
+        max_workers=n_jobs,
+        initializer=_init_worker,
+        initargs=(distance_algorithm, list(data)),
+    ) as executor:
+        distances[positions] = np.concatenate(
+            list(
+                executor.map(
+                    _compute_pairs_in_worker,
+                    [(rows[chunk], columns[chunk]) for chunk in chunks],
+                )
+            )
+        )
+    return distances
+
+
+def calculate_cross_distance_matrix(
+    distance_algorithm: Any, rows: Sequence, columns: Sequence
+) -> np.ndarray:
+    """Calculate the distances between two different sets of data points.
+
+    Args:
+        distance_algorithm (DistanceAlgorithm): Algorithm used to compare.
+        rows (Sequence): Data points of the rows.
+        columns (Sequence): Data points of the columns.
+
+    Returns:
+        np.ndarray: Distance matrix of shape (len(rows), len(columns)).
+    """
+    distances = np.empty((len(rows), len(columns)))
+    for i, a in enumerate(rows):
+        for j, b in enumerate(columns):
+            distances[i, j] = distance_algorithm.compare(a, b)
+    return distances
+
+
+def nearest_neighbors(
+    distance_algorithm: Any, data: Sequence, start: int, stop: int, n_neighbors: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Find the nearest neighbors of the rows `start` to `stop`.
+
+    Args:
+        distance_algorithm (DistanceAlgorithm): Algorithm used to compare.
+        data (Sequence): Data points.
+        start (int): First row.
+        stop (int): Row after the last one.
+        n_neighbors (int): Number of neighbors of every row, including itself.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Indices and dissimilarities of the
+            neighbors of every row, from the nearest.
+    """
+    distances = distance_algorithm.cross_distance_matrix(data[start:stop], data)
+    distances = distance_algorithm.to_dissimilarity(distances)
+    rows = np.arange(stop - start)
+    # Every row is its own nearest neighbor, even if it has duplicates
+    distances[rows, rows + start] = -np.inf
+    indices = np.argpartition(distances, n_neighbors - 1, axis=1)[:, :n_neighbors]
+    values = np.take_along_axis(distances, indices, axis=1)
+    order = np.argsort(values, axis=1, kind="stable")
+    indices = np.take_along_axis(indices, order, axis=1)
+    values = np.take_along_axis(values, order, axis=1)
+    values[:, 0] = 0
+    return indices, values
+
+
+def _nearest_neighbors_in_worker(block: Tuple[int, int, int]):
+    return nearest_neighbors(
+        _worker_state["distance_algorithm"], _worker_state["data"], *block
+    )
+
+
+def calculate_neighbor_graph(
+    distance_algorithm: Any, data: Sequence, n_neighbors: int, n_jobs: int = 1
+) -> sparse.csr_matrix:
+    """Calculate the sparse graph of the k nearest neighbors of every data point.
+
+    The rows are compared by blocks, and only the nearest neighbors of every
+    block are kept, so memory grows with the number of neighbors instead of
+    with the square of the number of data points.
+
+    Args:
+        distance_algorithm (DistanceAlgorithm): Algorithm used to compare.
+        data (Sequence): Data points.
+        n_neighbors (int): Number of neighbors of every data point, including itself.
+        n_jobs (int, optional): Number of worker processes. Defaults to 1.
+
+    Returns:
+        sparse.csr_matrix: Dissimilarities to the neighbors, with explicit zeros.
+    """
+    n = len(data)
+    n_neighbors = min(n_neighbors, n)
+    n_jobs = resolve_n_jobs(n_jobs)
+    data = list(data)
+    block = max(1, NEIGHBOR_BLOCK_SIZE // max(n, 1))
+    blocks = [
+        (start, min(start + block, n), n_neighbors) for start in range(0, n, block)
+    ]
+    if n_jobs == 1 or n * n < MIN_PARALLEL_PAIRS:
+        results = [nearest_neighbors(distance_algorithm, data, *b) for b in blocks]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=n_jobs,
+            initializer=_init_worker,
+            initargs=(distance_algorithm, data),
+        ) as executor:
+            results = list(executor.map(_nearest_neighbors_in_worker, blocks))
+    indices = np.concatenate([indices for indices, _ in results]).ravel()
+    values = np.concatenate([values for _, values in results]).ravel()
+    indptr = np.arange(0, n * n_neighbors + 1, n_neighbors)
+    return sparse.csr_matrix((values, indices, indptr), shape=(n, n))
@@ -1,7 +1,28 @@
 from abc import ABC, abstractmethod
+from typing import List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from marissa.distance_metrics.distance_matrix import (
+    calculate_cross_distance_matrix,
+    calculate_distance_matrix,
+    calculate_neighbor_graph,
+    calculate_nodes,
+)
+from marissa.profiling import profiled
 
 
 class DistanceAlgorithm(ABC):
+    # Distance of a node to itself, used to fill the diagonal of the matrix.
+    self_distance: float = 0.0
+    # Version of the nodes and distances, cached results of other versions are discarded.
+    version: str = "1"
+    # DistanceCache of the distance matrices, if any.
+    cache = None
+    # Distance of the pairs left out by `candidate_pairs`.
+    unrelated_distance: float = None
+
     @classmethod
     @abstractmethod
     def compare(cls, a: str, b: str) -> float:
@@ -27,3 +48,127 @@ class DistanceAlgorithm(ABC):
             str: Converted data.
         """
         return a
+
+    def calculate_nodes(self, payloads: List[bytes], n_jobs: int = 1) -> List[str]:
+        """Calculate the node of every payload.
+
+        Args:
+            payloads (List[bytes]): Payloads.
+            n_jobs (int, optional): Number of worker processes. Defaults to 1.
+
+        Returns:
+            List[str]: Node of every payload.
+        """
+        return calculate_nodes(self, payloads, n_jobs=n_jobs)
+
+    @profiled()
+    def distance_matrix(
+        self, data: List[str], n_jobs: int = 1, condensed: bool = False
+    ) -> np.ndarray:
+        """Get the distance matrix between all data points, from the cache if possible.
+
+        Args:
+            data (List[str]): List of nodes.
+            n_jobs (int, optional): Number of worker processes. Defaults to 1.
+            condensed (bool, optional): Return only the upper triangle. Defaults to False.
+
+        Returns:
+            np.ndarray: Distance matrix.
+        """
+        if self.cache is None or not self.cache.distances:
+            return self.calculate_distance_matrix(data, n_jobs, condensed)
+        return self.cache.distance_matrix(
+            self,
+            data,
+            lambda: self.calculate_distance_matrix(data, n_jobs, condensed=True),
+            condensed,
+        )
+
+    def calculate_distance_matrix(
+        self, data: List[str], n_jobs: int = 1, condensed: bool = False
+    ) -> np.ndarray:
+        """Calculate the distance matrix between all data points.
+
+        Args:
+            data (List[str]): List of nodes.
+            n_jobs (int, optional): Number of worker processes. Defaults to 1.
+            condensed (bool, optional): Return only the upper triangle. Defaults to False.
+
+        Returns:
+            np.ndarray: Distance matrix.
+        """
+        return calculate_distance_matrix(self, data, n_jobs=n_jobs, condensed=condensed)
+
+    def candidate_pairs(
+        self, data: List[str]
+    ) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Find the pairs of nodes worth comparing in the distance matrix.
+
+        Args:
+            data (List[str]): List of nodes.
+
+        Returns:
+            Optional[Tuple[np.ndarray, np.ndarray]]: Rows and columns of the pairs,
+                or None to compare every pair.
+        """
+        return None
+
+    def cross_distance_matrix(self, rows: List[str], columns: List[str]) -> np.ndarray:
+        """Calculate the distances between two different sets of nodes.
+
+        Args:
+            rows (List[str]): Nodes of the rows.
+            columns (List[str]): Nodes of the columns.
+
+        Returns:
+            np.ndarray: Distance matrix of shape (len(rows), len(columns)).
+        """
+        return calculate_cross_distance_matrix(self, rows, columns)
+
+    def neighbor_graph(
+        self, data: List[str], n_neighbors: int, n_jobs: int = 1
+    ) -> sparse.csr_matrix:
+        """Calculate the sparse graph of the nearest neighbors of every node.
+
+        Args:
+            data (List[str]): List of nodes.
+            n_neighbors (int): Number of neighbors of every node, including itself.
+            n_jobs (int, optional): Number of worker processes. Defaults to 1.
+
+        Returns:
+            sparse.csr_matrix: Dissimilarities to the neighbors.
+        """
+        return calculate_neighbor_graph(self, data, n_neighbors, n_jobs=n_jobs)
+
+    def cache_options(self) -> dict:
+        """Get the options that change the nodes or the distances."""
+        return {key: value for key, value in vars(self).items() if key != "cache"}
+
+    def to_dissimilarity(self, distances: np.ndarray) -> np.ndarray:
+        """Convert the results of `compare` so that lower values mean closer nodes.
+
+        Args:
+            distances (np.ndarray): Results of `compare`.
+
+        Returns:
+            np.ndarray: Dissimilarities.
+        """
+        return distances
+
+    def unrelated(self, dissimilarities: np.ndarray) -> np.ndarray:
+        """Find the dissimilarities of nodes that can't be compared.
+
+        Pairs left out by `candidate_pairs`, and digests that can't be compared,
+        score `unrelated_distance`, which says nothing about how close they are.
+
+        Args:
+            dissimilarities (np.ndarray): Results of `to_dissimilarity`.
+
+        Returns:
+            np.ndarray: Whether every dissimilarity is the one of unrelated nodes.
+        """
+        if self.unrelated_distance is None:
+            return np.zeros(np.shape(dissimilarities), dtype=bool)
+        return dissimilarities >= self.to_dissimilarity(
+            np.float64(self.unrelated_distance)
+        )
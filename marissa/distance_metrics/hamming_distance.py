@@ -1,6 +1,147 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple, Union
+
+import numpy as np
+
 from marissa.distance_metrics import DistanceAlgorithm
+from marissa.distance_metrics.distance_matrix import condensed_size, resolve_n_jobs
+from marissa.profiling import Profiler
+
+# Number of set bits of every byte value.
+POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+# Maximum number of byte comparisons evaluated in a single vectorized block.
+BLOCK_SIZE = 1 << 24
+
+
+def to_bytes(data: Union[str, bytes]) -> bytes:
+    """Convert a hexadecimal string or a bytes-like object to bytes."""
+    if isinstance(data, str):
+        return bytes.fromhex(data)
+    return bytes(data)
+
+
+def pack(data: List[Union[str, bytes]]) -> Tuple[np.ndarray, np.ndarray]:
+    """Pack packets into a zero padded uint8 matrix.
+
+    Args:
+        data (List[Union[str, bytes]]): Packets as hexadecimal strings or bytes.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Padded matrix and the length of every packet.
+    """
+    packets = [to_bytes(packet) for packet in data]
+    lengths = np.fromiter(map(len, packets), dtype=np.int64, count=len(packets))
+    matrix = np.zeros((len(packets), lengths.max(initial=0)), dtype=np.uint8)
+    for i, packet in enumerate(packets):
+        matrix[i, : len(packet)] = np.frombuffer(packet, dtype=np.uint8)
+    return matrix, lengths
 
 
 class HammingDistance(DistanceAlgorithm):
-    def compare(cls, a: str, b: str) -> float:
-        return sum(c1 != c2 for c1, c2 in zip(a, b))
+    def __init__(self, mode: str = "byte", length_penalty: float = 1.0):
+        """Hamming distance between packets.
+
+        Only the bytes both packets have in common are compared. Every byte one
+        packet has beyond the length of the other adds `length_penalty` to the
+        distance, counted as 8 bits in bit mode.
+
+        Args:
+            mode (str, optional): Count different "byte"s or different "bit"s.
+                Defaults to "byte".
+            length_penalty (float, optional): Penalty of every missing byte. Defaults to 1.0.
+        """
+        if mode not in ("byte", "bit"):
+            raise ValueError(f"Unknown Hamming mode: {mode}")
+        self.mode = mode
+        self.length_penalty = length_penalty
+
+    def compare(self, a: Union[str, bytes], b: Union[str, bytes]) -> float:
+        matrix, lengths = pack([a, b])
+        return float(
+            self.block_distances(matrix[:1], lengths[:1], matrix[1:], lengths[1:])[0, 0]
+        )
+
+    def block_distances(
+        self,
+        rows: np.ndarray,
+        rows_lengths: np.ndarray,
+        columns: np.ndarray,
+        columns_lengths: np.ndarray,
+    ) -> np.ndarray:
+        """Calculate the distances between two blocks of packed packets.
+
+        Args:
+            rows (np.ndarray): Packed packets of the rows.
+            rows_lengths (np.ndarray): Lengths of the rows.
+            columns (np.ndarray): Packed packets of the columns, with the same width.
+            columns_lengths (np.ndarray): Lengths of the columns.
+
+        Returns:
+            np.ndarray: Distance matrix of shape (len(rows), len(columns)).
+        """
+        diff = rows[:, None, :] ^ columns[None, :, :]
+        if self.mode == "bit":
+            diff = POPCOUNT[diff]
+            unit = 8
+        else:
+            diff = diff != 0
+            unit = 1
+        common = np.minimum(rows_lengths[:, None], columns_lengths[None, :])
+        in_common = np.arange(rows.shape[1]) < common[:, :, None]
+        distances = np.sum(diff, axis=2, where=in_common, dtype=np.float64)
+        length_difference = np.abs(rows_lengths[:, None] - columns_lengths[None, :])
+        return distances + self.length_penalty * unit * length_difference
+
+    def cross_distance_matrix(
+        self, rows: List[Union[str, bytes]], columns: List[Union[str, bytes]]
+    ) -> np.ndarray:
+        matrix, lengths = pack([*rows, *columns])
+        columns, columns_lengths = matrix[len(rows) :], lengths[len(rows) :]
+        block = max(1, BLOCK_SIZE // max(1, columns.size))
+        return np.concatenate(
+            [
+                self.block_distances(
+                    matrix[start : min(start + block, len(rows))],
+                    lengths[start : min(start + block, len(rows))],
+                    columns,
+                    columns_lengths,
+                )
+                for start in range(0, len(rows), block)
+            ]
+        ).reshape(len(rows), len(columns))
+
+    def calculate_distance_matrix(
+        self, data: List[Union[str, bytes]], n_jobs: int = 1, condensed: bool = False
+    ) -> np.ndarray:
+        """Calculate the distance matrix in vectorized blocks of rows.
+
+        Every block is only compared with itself and the following rows, and the
+        blocks are split between threads when `n_jobs` is not 1.
+
+        Args:
+            data (List[Union[str, bytes]]): Packets as hexadecimal strings or bytes.
+            n_jobs (int, optional): Number of threads. Defaults to 1.
+            condensed (bool, optional): Return only the upper triangle. Defaults to False.
+
+        Returns:
+            np.ndarray: Distance matrix.
+        """
+        matrix, lengths = pack(data)
+        n, width = matrix.shape
+        Profiler().count("pairs compared", condensed_size(n))
+        distances = np.zeros((n, n))
+        block = max(1, BLOCK_SIZE // max(1, n * width))
+
+        def fill(start: int):
+            stop = min(start + block, n)
+            values = self.block_distances(
+                matrix[start:stop], lengths[start:stop], matrix[start:], lengths[start:]
+            )
+            distances[start:stop, start:] = values
+            distances[start:, start:stop] = values.T
+
+        with ThreadPoolExecutor(max_workers=resolve_n_jobs(n_jobs)) as executor:
+            list(executor.map(fill, range(0, n, block)))
+        if condensed:
+            return distances[np.triu_indices(n, 1)]
+        return distances
@@ -1,11 +1,73 @@
+import re
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
 import ssdeep
 
 from marissa.distance_metrics import DistanceAlgorithm
+from marissa.distance_metrics.candidates import shared_key_pairs
+
+# ssdeep scores 0 the signatures without a common substring of this length.
+COMMON_SUBSTRING_LENGTH = 7
+# Runs of more than three equal characters are shortened before comparing.
+REPEATED_CHARACTERS = re.compile(r"(.)\1{3,}")
+
+
+def strip_sequences(signature: str) -> str:
+    """Shorten the runs of equal characters as ssdeep does before comparing."""
+    return REPEATED_CHARACTERS.sub(r"\1\1\1", signature)
 
 
 class SSDEEPDistance(DistanceAlgorithm):
+    # ssdeep scores identical hashes with the maximum similarity.
+    self_distance = 100.0
+    # Digests that can't be compared score the minimum similarity.
+    unrelated_distance = 0.0
+    # Version 2 digests are calculated on the bytes of the payload.
+    version = "2"
+
+    def __init__(self, prune: bool = True):
+        """ssdeep similarity between packets.
+
+        Args:
+            prune (bool, optional): Only compare the digests that can score above
+                0: those with compatible block sizes and a common substring of
+                COMMON_SUBSTRING_LENGTH characters. Defaults to True.
+        """
+        self.prune = prune
+
     def compare(cls, a: str, b: str) -> float:
         return ssdeep.compare(a, b)
 
-    def calculate_node(cls, a: str) -> str:
-        return ssdeep.hash(a)
+    def calculate_node(cls, a: bytes) -> str:
+        return ssdeep.hash(bytes(a))
+
+    def to_dissimilarity(cls, distances: np.ndarray) -> np.ndarray:
+        # ssdeep returns a similarity score between 0 and 100.
+        return 100 - distances
+
+    def candidate_pairs(
+        self, data: List[str]
+    ) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        if not self.prune:
+            return None
+        return shared_key_pairs(map(self.index_keys, data), len(data))
+
+    @staticmethod
+    def index_keys(digest: str) -> Iterator[tuple]:
+        """Index keys of a digest, shared by every digest it can score above 0 with.
+
+        The two signatures of a digest are computed with its block size and
+        twice its block size, and only signatures of the same block size are
+        compared, so every substring is keyed with the block size of its
+        signature. Equal first signatures always score 100, even if shorter
+        than a substring.
+        """
+        block_size, first, second = digest.split(":", 2)
+        block_size = int(block_size)
+        first = strip_sequences(first)
+        second = strip_sequences(second.split(",")[0])
+        yield "digest", block_size, first
+        for size, signature in ((block_size, first), (2 * block_size, second)):
+            for i in range(len(signature) - COMMON_SUBSTRING_LENGTH + 1):
+                yield size, signature[i : i + COMMON_SUBSTRING_LENGTH]
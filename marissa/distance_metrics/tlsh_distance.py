@@ -1,11 +1,285 @@
+from typing import List, Optional, Tuple
+
+import numpy as np
 import tlsh
 
 from marissa.distance_metrics import DistanceAlgorithm
+from marissa.distance_metrics.candidates import MAX_CANDIDATE_FRACTION
+from marissa.distance_metrics.distance_matrix import (
+    condensed_size,
+    row_offset,
+    squareform,
+)
+from marissa.distance_metrics.hamming_distance import BLOCK_SIZE
+from marissa.profiling import Profiler
+
+# Largest diff between two digests: length, quartile ratios, checksum and body.
+MAX_DISTANCE = 128 * 12 + 2 * 7 * 12 + 1 + 32 * 4 * 6
+# Bytes of a digest: checksum, length, quartile ratios and a 32 byte body.
+DIGEST_SIZE = 35
+# Version prefix of the hexadecimal digests.
+VERSION_PREFIX = "T1"
+CHECKSUM, LENGTH, RATIOS = 0, 1, 2
+BODY = slice(3, DIGEST_SIZE)
+
+
+def swap_nibbles(values: np.ndarray) -> np.ndarray:
+    return (values >> 4) | (values << 4)
+
+
+def dibit_distance(a: int, b: int) -> int:
+    """Diff of two body bytes, adding the distance of their four 2-bit buckets."""
+    distance = 0
+    for shift in range(0, 8, 2):
+        difference = abs((a >> shift & 3) - (b >> shift & 3))
+        # Opposite buckets count double
+        distance += 6 if difference == 3 else difference
+    return distance
+
+
+# Diff of every pair of body bytes.
+BODY_DISTANCE = np.array(
+    [[dibit_distance(a, b) for b in range(256)] for a in range(256)], dtype=np.uint8
+)
+
+
+def circular_distance(a: np.ndarray, b: np.ndarray, modulo: int) -> np.ndarray:
+    difference = np.abs(a.astype(np.int64) - b.astype(np.int64))
+    return np.minimum(difference, modulo - difference)
+
+
+def pack(digests: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Pack hexadecimal digests into a uint8 matrix of DIGEST_SIZE columns.
+
+    Args:
+        digests (List[str]): TLSH digests, with or without the version prefix.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Digest matrix, with the nibbles of the
+            header bytes in their real order, and whether every digest is
+            valid. Short inputs have no digest ("TNULL").
+    """
+    width = 2 * DIGEST_SIZE
+    texts = [digest.removeprefix(VERSION_PREFIX) for digest in digests]
+    valid = np.array([len(text) == width for text in texts], dtype=bool)
+    matrix = np.zeros((len(digests), DIGEST_SIZE), dtype=np.uint8)
+    if valid.any():
+        matrix[valid] = np.frombuffer(
+            bytes.fromhex("".join(text for text in texts if len(text) == width)),
+            dtype=np.uint8,
+        ).reshape(-1, DIGEST_SIZE)
+    matrix[:, : BODY.start] = swap_nibbles(matrix[:, : BODY.start])
+    return matrix, valid
 
 
 class TLSHDistance(DistanceAlgorithm):
-    def compare(cls, a: str, b: str) -> float:
-        return tlsh.diff(a, b)
+    # Version 2 digests are calculated on the bytes of the payload.
+    version = "2"
+    # Pairs in distant length buckets are not compared.
+    unrelated_distance = float(MAX_DISTANCE)
+
+    def __init__(self, prune: bool = True, length_window: int = 8):
+        """TLSH distance between packets.
+
+        The digests are packed into a uint8 matrix and compared in vectorized
+        blocks, with the same diff as `tlsh.diff`. Digests of payloads too short
+        or too uniform for TLSH ("TNULL") are unrelated to every other one.
+
+        Args:
+            prune (bool, optional): Only compare the digests with close length
+                bytes. Every step of the length byte adds 12 to the diff. Pairs
+                less than half `length_window` apart are always compared, and
+                pairs `length_window` or more apart never are. Defaults to True.
+            length_window (int, optional): Width of the length buckets. Defaults to 8.
+        """
+        self.prune = prune
+        self.length_window = length_window
+
+    def compare(self, a: str, b: str) -> float:
+        matrix, valid = pack([a, b])
+        return float(
+            self.block_distances(matrix[:1], valid[:1], matrix[1:], valid[1:])[0, 0]
+        )
+
+    def calculate_node(self, a: bytes) -> str:
+        return tlsh.hash(bytes(a))
+
+    def block_distances(
+        self,
+        rows: np.ndarray,
+        rows_valid: np.ndarray,
+        columns: np.ndarray,
+        columns_valid: np.ndarray,
+    ) -> np.ndarray:
+        """Calculate the diffs between two blocks of packed digests.
+
+        Args:
+            rows (np.ndarray): Packed digests of the rows.
+            rows_valid (np.ndarray): Whether every row has a digest.
+            columns (np.ndarray): Packed digests of the columns.
+            columns_valid (np.ndarray): Whether every column has a digest.
+
+        Returns:
+            np.ndarray: Distance matrix of shape (len(rows), len(columns)).
+        """
+        return self.digest_distances(
+            rows[:, None], rows_valid[:, None], columns[None, :], columns_valid[None, :]
+        )
+
+    @staticmethod
+    def digest_distances(
+        a: np.ndarray, a_valid: np.ndarray, b: np.ndarray, b_valid: np.ndarray
+    ) -> np.ndarray:
+        """Calculate the diffs between packed digests, broadcast against each other.
+
+        Args:
+            a (np.ndarray): Packed digests, along the last axis.
+            a_valid (np.ndarray): Whether every digest of `a` is valid.
+            b (np.ndarray): Packed digests compared with those of `a`.
+            b_valid (np.ndarray): Whether every digest of `b` is valid.
+
+        Returns:
+            np.ndarray: Diffs, with the broadcast shape of all but the last axis.
+        """
+        length = circular_distance(a[..., LENGTH], b[..., LENGTH], 256)
+        distances = np.where(length <= 1, length, length * 12)
+        for shift in (0, 4):
+            ratio = circular_distance(
+                a[..., RATIOS] >> shift & 15, b[..., RATIOS] >> shift & 15, 16
+            )
+            distances += np.where(ratio <= 1, ratio, (ratio - 1) * 12)
+        distances += a[..., CHECKSUM] != b[..., CHECKSUM]
+        distances += BODY_DISTANCE[a[..., BODY], b[..., BODY]].sum(
+            axis=-1, dtype=np.int64
+        )
+        return np.where(a_valid & b_valid, distances, MAX_DISTANCE).astype(np.float64)
+
+    def cross_distance_matrix(self, rows: List[str], columns: List[str]) -> np.ndarray:
+        matrix, valid = pack([*rows, *columns])
+        columns, columns_valid = matrix[len(rows) :], valid[len(rows) :]
+        block = max(1, BLOCK_SIZE // max(1, columns.size))
+        return np.concatenate(
+            [
+                self.block_distances(
+                    matrix[start : min(start + block, len(rows))],
+                    valid[start : min(start + block, len(rows))],
+                    columns,
+                    columns_valid,
+                )
+                for start in range(0, len(rows), block)
+            ]
+        ).reshape(len(rows), len(columns))
+
+    def calculate_distance_matrix(
+        self, data: List[str], n_jobs: int = 1, condensed: bool = False
+    ) -> np.ndarray:
+        """Calculate the distance matrix, vectorized over the candidate pairs.
+
+        Only the pairs found by `candidate_pairs` are compared, in chunks, and
+        the rest get `unrelated_distance`. When most pairs are candidates, every
+        pair is compared in vectorized blocks of rows instead, and the pairs
+        in distant length buckets are then set to `unrelated_distance`.
+
+        Args:
+            data (List[str]): TLSH digests.
+            n_jobs (int, optional): Unused, the pairs are vectorized. Defaults to 1.
+            condensed (bool, optional): Return only the upper triangle. Defaults to False.
+
+        Returns:
+            np.ndarray: Distance matrix.
+        """
+        n = len(data)
+        pairs = self.candidate_pairs(data)
+        if pairs is not None:
+            Profiler().count("pairs compared", len(pairs[0]))
+            distances = self.pair_distances(data, *pairs)
+            return (
+                distances if condensed else squareform(distances, n, self.self_distance)
+            )
+        Profiler().count("pairs compared", condensed_size(n))
+        distances = self.cross_distance_matrix(data, data)
+        np.fill_diagonal(distances, self.self_distance)
+        if self.prune:
+            matrix, _ = pack(data)
+            buckets = self.length_buckets(matrix[:, LENGTH])
+            related = np.zeros(distances.shape, dtype=bool)
+            for grid in buckets:
+                related |= grid[:, None] == grid[None, :]
+            distances[~related] = self.unrelated_distance
+        if condensed:
+            return distances[np.triu_indices(len(data), 1)]
+        return distances
+
+    def pair_distances(
+        self, data: List[str], rows: np.ndarray, columns: np.ndarray
+    ) -> np.ndarray:
+        """Calculate a condensed distance matrix comparing only some pairs.
+
+        Args:
+            data (List[str]): TLSH digests.
+            rows (np.ndarray): First digest of every pair, lower than its column.
+            columns (np.ndarray): Second digest of every pair.
+
+        Returns:
+            np.ndarray: Condensed distances, `unrelated_distance` for the other pairs.
+        """
+        n = len(data)
+        matrix, valid = pack(data)
+        distances = np.full(condensed_size(n), self.unrelated_distance)
+        positions = row_offset(n, rows) + columns - rows - 1
+        chunk = max(1, BLOCK_SIZE // DIGEST_SIZE)
+        for start in range(0, len(rows), chunk):
+            a, b = rows[start : start + chunk], columns[start : start + chunk]
+            distances[positions[start : start + chunk]] = self.digest_distances(
+                matrix[a], valid[a], matrix[b], valid[b]
+            )
+        return distances
+
+    def length_buckets(self, lengths: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Buckets of the length bytes, in two grids shifted by half a bucket."""
+        lengths = lengths.astype(np.int64)
+        return (
+            lengths // self.length_window,
+            (lengths + self.length_window // 2) // self.length_window,
+        )
+
+    def candidate_pairs(
+        self, data: List[str]
+    ) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Find the pairs of valid digests in the same bucket of either length grid.
+
+        Digests of payloads too short for TLSH are unrelated to every other one,
+        so they are never compared.
+
+        Args:
+            data (List[str]): TLSH digests.
 
-    def calculate_node(cls, a: str) -> int:
-        return tlsh.hash(a.encode("utf-8"))
+        Returns:
+            Optional[Tuple[np.ndarray, np.ndarray]]: Rows and columns of the pairs,
+                or None to compare every pair when pruning is off or most pairs
+                are candidates.
+        """
+        if not self.prune:
+            return None
+        matrix, valid = pack(data)
+        indices = np.flatnonzero(valid)
+        first, second = self.length_buckets(matrix[indices, LENGTH])
+        limit = MAX_CANDIDATE_FRACTION * condensed_size(len(data))
+        rows, columns, total = [], [], 0
+        for grid, other in ((first, None), (second, first)):
+            order = np.argsort(grid, kind="stable")
+            for group in np.split(order, np.flatnonzero(np.diff(grid[order])) + 1):
+                # The stable sort keeps every group in increasing order
+                a, b = np.triu_indices(len(group), 1)
+                a, b = group[a], group[b]
+                if other is not None:
+                    # Pairs in the same bucket of the first grid are already there
+                    a, b = a[other[a] != other[b]], b[other[a] != other[b]]
+                rows.append(indices[a])
+                columns.append(indices[b])
+                total += len(a)
+                if total > limit:
+                    return None
+        if not rows:
+            return np.empty(0, np.int64), np.empty(0, np.int64)
+        return np.concatenate(rows), np.concatenate(columns)
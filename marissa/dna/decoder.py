@@ -1,41 +1,45 @@
 import os
 
+import numpy as np
+
 conversion_table = {"A": "00", "T": "01", "G": "10", "C": "11"}
 
+# Value of every nucleotide, and -1 for gaps and any other character.
+nucleotide_values = np.full(256, -1, dtype=np.int16)
+for nucleotide, bits in conversion_table.items():
+    nucleotide_values[ord(nucleotide)] = int(bits, 2)
+    nucleotide_values[ord(nucleotide.lower())] = int(bits, 2)
+
+# Hexadecimal characters of every byte value.
+hex_table = np.array(
+    [list(f"{byte:02x}".encode()) for byte in range(256)], dtype=np.uint8
+)
 
-def convert_bits(bits):
-    bits_str = "".join(
-        [conversion_table[x] for x in bits.upper() if x in conversion_table]
-    )
-    if bits_str == "":
-        return "-"
-    byte_ = int(bits_str, 2)
-    return byte_
+# Weight of each of the four nucleotides of a byte.
+nucleotide_weights = np.array([64, 16, 4, 1], dtype=np.int16)
 
 
 def to_bytes(sequence):
-    ret = []
-    indexes = list(range(0, len(sequence), 4))
-    last_index = indexes.pop(0)
-
-    for index in indexes:
-        bits = sequence[last_index:index]
-        last_index = index
-        bits = bits.replace("-", "")
-        byte_ = convert_bits(bits)
-        if byte_ == "-":
-            ret.append("--")
-        else:
-            ret.append(format(byte_, "x").zfill(2))
-
-    bits = sequence[last_index:]
-    byte_ = convert_bits(bits)
-    if byte_ == "-":
-        ret.append("--")
-    else:
-        ret.append(format(byte_, "x").zfill(2))
+    """Convert an aligned DNA sequence to hexadecimal bytes and gaps.
 
-    return "".join(ret)
+    Every group of four alignment columns is one byte column. A byte is placed
+    in the column where its first nucleotide was aligned, which keeps the order
+    of the bytes because the four nucleotides of a byte are never in the same
+    group as the first nucleotide of the next byte. Columns without a byte are
+    gaps ("--").
+    """
+    columns = np.frombuffer(sequence.encode("ascii"), dtype=np.uint8)
+    values = nucleotide_values[columns]
+    positions = np.flatnonzero(values >= 0)
+    nucleotides = values[positions]
+    # An incomplete last byte is completed with zeros
+    missing = -len(nucleotides) % 4
+    nucleotides = np.concatenate((nucleotides, np.zeros(missing, dtype=np.int16)))
+    bytes_ = nucleotides.reshape(-1, 4) @ nucleotide_weights
+
+    aligned = np.full(((len(columns) + 3) // 4, 2), ord("-"), dtype=np.uint8)
+    aligned[positions[::4] // 4] = hex_table[bytes_]
+    return aligned.tobytes().decode("ascii")
 
 
 def read_file(filename):
@@ -50,37 +54,48 @@ def main(filename):
     if not os.path.isfile(filename):
         print(f"[-] {os.path.basename(__file__)}\t: ERROR\t: {filename}\t: Not a file")
         return
-    data = read_file(os.path.abspath(filename))
-    packets = []
+    return decode(read_file(os.path.abspath(filename)))
+
+
+def read_alignment(data):
+    """Read the aligned DNA sequences of a clustal file, sorted by their id."""
+    # The sequences may be wrapped in several blocks of lines
+    sequences = {}
     for line in data:
         if line.startswith("MSG."):
-            (msg_id, msg) = [item for item in line.split(" ") if item]
-            msg_copy = msg.replace("-", "")
-            buffer = to_bytes(msg)
-            buffer_copy = to_bytes(msg_copy)
-            # it aligns bits so the byte can be cut in half so we use two arrays to convert it back to hexadecimal
-            # One knows where the dashes are and the other knows the correct hexadecimal
-            # TODO: this code works but it's not very readable
-            i_copy = 0
-            for i in range(len(buffer)):
-                if buffer[i] == "-":
-                    mult = 1
-                    if i + 1 < len(buffer):
-                        mult = 3 if buffer[i + 1] != "-" else 1
-                        if buffer[i + 1] != "-":
-                            mult += (
-                                2
-                                if buffer_copy[i : i + 2] not in buffer[i : i + 5]
-                                else 0
-                            )
-                    buffer_copy = buffer_copy[:i] + "-" * mult + buffer_copy[i:]
-                i_copy += 1
-            packets.append(buffer_copy)
+            msg_id, msg = [item for item in line.split(" ") if item]
+            sequences.setdefault(msg_id, []).append(msg)
+
+    # clustal may reorder the sequences, so they are sorted back by their id
+    msg_ids = sorted(sequences, key=lambda msg_id: int(msg_id.split(".")[1]))
+    return {msg_id: "".join(sequences[msg_id]) for msg_id in msg_ids}
+
+
+def decode(data):
+    return decode_sequences(list(read_alignment(data).values()))
+
+
+def decode_sequences(sequences):
+    """Decode aligned DNA sequences, padded to the length of the longest.
+
+    Byte columns that are a gap in every sequence, like the last one when a
+    byte was split across the last groups of columns, are left out.
+    """
+    packets = [to_bytes(sequence) for sequence in sequences]
+    if not packets:
+        return packets
 
     # find the length of the longest packet
     longest = max([len(packet) for packet in packets])
 
     # pad all packets to the length of the longest packet
     packets = [packet.ljust(longest, "-") for packet in packets]
+    if not longest:
+        return packets
 
-    return packets
+    characters = np.frombuffer("".join(packets).encode("ascii"), dtype=np.uint8)
+    characters = characters.reshape(len(packets), -1, 2)
+    filled = (characters[:, :, 0] != ord("-")).any(axis=0)
+    if filled.all():
+        return packets
+    return [row.tobytes().decode("ascii") for row in characters[:, filled]]
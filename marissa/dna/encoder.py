@@ -3,35 +3,66 @@
 import os
 import sys
 
+import numpy as np
+
 conversion_table = {"00": "A", "01": "T", "10": "G", "11": "C"}
 
+# ASCII nucleotides of every byte value, from its most significant bits.
+dna_table = np.array(
+    [
+        [ord(conversion_table[f"{byte:08b}"[i : i + 2]]) for i in range(0, 8, 2)]
+        for byte in range(256)
+    ],
+    dtype=np.uint8,
+)
+
 
 def to_dna_sequence(item):
-    ret = ""
+    return dna_table[np.frombuffer(item, dtype=np.uint8)].tobytes().decode("ascii")
 
-    for byte in item:
-        bites = f"{byte:08b}"
-        ret += conversion_table[bites[0:2]]
-        ret += conversion_table[bites[2:4]]
-        ret += conversion_table[bites[4:6]]
-        ret += conversion_table[bites[6:8]]
 
-    return ret
+def to_aligned_dna_sequence(aligned):
+    """Encode an aligned hexadecimal payload, with "--" gaps, as aligned DNA."""
+    nucleotides = dna_table[
+        np.frombuffer(bytes.fromhex(aligned.replace("--", "00")), dtype=np.uint8)
+    ]
+    nucleotides[
+        np.frombuffer(aligned.encode("ascii"), dtype=np.uint8)[::2] == ord("-")
+    ] = ord("-")
+    return nucleotides.tobytes().decode("ascii")
 
 
-def main(data, output):
-    max_len = 0
+def to_dna_sequences(data):
+    """Encode a batch of packets with a single lookup over all their bytes."""
+    lengths = np.fromiter((len(item) for item in data), dtype=np.int64, count=len(data))
+    encoded = to_dna_sequence(b"".join(data))
+    bounds = np.concatenate(([0], np.cumsum(lengths * 4)))
+    return [encoded[start:stop] for start, stop in zip(bounds[:-1], bounds[1:])]
 
-    with open(output, "w") as f:
-        for i, item in enumerate(data):
-            bytes_ = bytes.fromhex(item)
-            dna_sequence = to_dna_sequence(bytes_)
-            f.write(f">MSG.{i:0{len(str(len(data)))}}\n")
 
-            if max_len < len(dna_sequence):
-                max_len = len(dna_sequence)
+def sequence_names(count, start=0):
+    """Names MSG.<number> of `count` sequences from `start`, padded to the same width.
+
+    The FASTA files, profiles, distance matrices and guide trees given to
+    clustalo must all name the sequences with it.
+    """
+    width = len(str(start + count))
+    return [f"MSG.{i:0{width}}" for i in range(start, start + count)]
 
-            f.write(f"{dna_sequence}\n")
+
+def to_fasta(data, start=0):
+    """Encode packets as FASTA sequences named MSG.<number>, from `start`."""
+    return "".join(
+        f">{name}\n{dna_sequence}\n"
+        for name, dna_sequence in zip(
+            sequence_names(len(data), start), to_dna_sequences(data)
+        )
+    )
+
+
+def main(data, output):
+    with open(output, "w") as f:
+        f.write(to_fasta(data))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,30 @@
+import importlib
+import sys
+from typing import Callable, Dict, List, Tuple
+
+
+def attach(
+    package: str, exports: Dict[str, str]
+) -> Tuple[Callable, Callable, List[str]]:
+    """Import the exports of a package on first use, with a module `__getattr__` (PEP 562).
+
+    Args:
+        package (str): Name of the package, `__name__` in its `__init__`.
+        exports (Dict[str, str]): Module of every exported name, relative to the package.
+
+    Returns:
+        Tuple[Callable, Callable, List[str]]: `__getattr__`, `__dir__` and `__all__`
+            of the package.
+    """
+
+    def __getattr__(name: str):
+        if name not in exports:
+            raise AttributeError(f"module {package!r} has no attribute {name!r}")
+        value = getattr(importlib.import_module(exports[name], package), name)
+        setattr(sys.modules[package], name, value)
+        return value
+
+    def __dir__() -> List[str]:
+        return sorted(set(vars(sys.modules[package])) | set(exports))
+
+    return __getattr__, __dir__, sorted(exports)
@@ -3,14 +3,13 @@ from enum import Enum
 
 import typer
 
-from marissa import (
-    HammingDistance,
-    KMeansAlgorithm,
-    KMeansHierarchicalAlgorithm,
-    Marissa,
-    OpticsAlgorithm,
-    SSDEEPDistance,
-    TLSHDistance,
+from marissa.registry import (
+    ALIGNMENT_ALGORITHMS,
+    CLUSTER_ALGORITHMS,
+    DISTANCE_ALGORITHMS,
+    alignment_algorithm,
+    cluster_algorithm,
+    distance_algorithm,
 )
 
 app = typer.Typer(
@@ -21,16 +20,40 @@ app = typer.Typer(
 )
 
 
-class Distance_Types(str, Enum):
-    tlsh = "tlsh"
-    ssdeep = "ssdeep"
-    hamming = "hamming"
+Distance_Types = Enum(
+    "Distance_Types", {name: name for name in DISTANCE_ALGORITHMS}, type=str
+)
+
+
+class Hamming_Modes(str, Enum):
+    byte = "byte"
+    bit = "bit"
+
+
+class Sample_Strategies(str, Enum):
+    head = "head"
+    uniform = "uniform"
+    stratified = "stratified"
+
+
+class K_Criteria(str, Enum):
+    knee = "knee"
+    silhouette = "silhouette"
 
 
-class Cluster_Types(str, Enum):
-    optics = "optics"
-    kmeans = "kmeans"
-    kmeans_hierarchical = "kmeans_hierarchical"
+class Guide_Trees(str, Enum):
+    clustalo = "clustalo"
+    distances = "distances"
+    tree = "tree"
+
+
+Cluster_Types = Enum(
+    "Cluster_Types", {name: name for name in CLUSTER_ALGORITHMS}, type=str
+)
+
+Alignment_Types = Enum(
+    "Alignment_Types", {name: name for name in ALIGNMENT_ALGORITHMS}, type=str
+)
 
 
 @app.callback()
@@ -79,6 +102,22 @@ def main(
         help="The distance algorithm to use.",
         case_sensitive=False,
     ),
+    hamming_mode: Hamming_Modes = typer.Option(
+        Hamming_Modes.byte,
+        "--hamming-mode",
+        help="Count different bytes or bits with the hamming distance.",
+        case_sensitive=False,
+    ),
+    length_penalty: float = typer.Option(
+        1,
+        "--length-penalty",
+        help="The hamming distance added for every byte of length difference.",
+    ),
+    prune: bool = typer.Option(
+        True,
+        "--prune/--no-prune",
+        help="Only compare the ssdeep or tlsh digests that can be related.",
+    ),
     cluster_type: Cluster_Types = typer.Option(
         Cluster_Types.optics,
         "--cluster-algorithm",
@@ -86,22 +125,159 @@ def main(
         help="The cluster algorithm to use.",
         case_sensitive=False,
     ),
+    n_neighbors: int = typer.Option(
+        None,
+        "--neighbors",
+        "-n",
+        help="Cluster with OPTICS over a sparse graph of this number of nearest neighbors.",
+    ),
+    max_depth: int = typer.Option(
+        2,
+        "--max-depth",
+        help="The number of clustering levels of kmeans_hierarchical.",
+    ),
+    min_cluster_size: int = typer.Option(
+        2,
+        "--min-cluster-size",
+        help="The minimum size of the clusters refined by kmeans_hierarchical.",
+    ),
+    k_criterion: K_Criteria = typer.Option(
+        K_Criteria.knee,
+        "--k-criterion",
+        help="How kmeans and kmeans_hierarchical choose the number of clusters.",
+        case_sensitive=False,
+    ),
+    n_clusters: int = typer.Option(
+        None,
+        "--clusters",
+        "-k",
+        help="The number of clusters of kmedoids. Chosen by silhouette score by default.",
+    ),
+    alignment_type: Alignment_Types = typer.Option(
+        Alignment_Types.clustalo,
+        "--alignment-algorithm",
+        "-a",
+        help="The alignment algorithm to use.",
+        case_sensitive=False,
+    ),
+    guide_tree: Guide_Trees = typer.Option(
+        Guide_Trees.clustalo,
+        "--guide-tree",
+        help="Align with the guide tree of clustalo, or of the digest distances: as a matrix or an UPGMA tree.",
+        case_sensitive=False,
+    ),
+    n_jobs: int = typer.Option(
+        1,
+        "--jobs",
+        "-j",
+        help="The number of parallel workers and alignments. 0 uses all the cores.",
+    ),
+    threads: int = typer.Option(
+        None,
+        "--threads",
+        "-t",
+        help="The number of threads shared by the parallel alignments. Defaults to all the cores.",
+    ),
+    sample_size: int = typer.Option(
+        1000,
+        "--sample-size",
+        "-s",
+        help="The number of packets clusterized. The rest are assigned to the nearest cluster. 0 clusterizes all.",
+    ),
+    sample_strategy: Sample_Strategies = typer.Option(
+        Sample_Strategies.head,
+        "--sample-strategy",
+        help="How to choose the clusterized packets.",
+        case_sensitive=False,
+    ),
+    batch_size: int = typer.Option(
+        10000,
+        "--batch-size",
+        help="The number of packets assigned to the clusters at once.",
+    ),
+    max_alignment_size: int = typer.Option(
+        None,
+        "--max-alignment-size",
+        help="Align larger clusters in batches of this number of payloads, merged afterwards.",
+    ),
+    debug: bool = typer.Option(
+        False,
+        "--debug",
+        help="Keep the intermediate FASTA and clustal files in the results folder.",
+    ),
+    cache_dir: str = typer.Option(
+        None,
+        "--cache-dir",
+        help="Reuse the digests and distance matrices of previous runs stored in this folder.",
+    ),
+    cache_size: int = typer.Option(
+        1024,
+        "--cache-size",
+        help="The maximum size of the cache in MB. The least recently used entries are removed.",
+    ),
+    cache_distances: bool = typer.Option(
+        True,
+        "--cache-distances/--no-cache-distances",
+        help="Also cache the distance matrices, not only the digests.",
+    ),
+    deduplicate: bool = typer.Option(
+        True,
+        "--deduplicate/--no-deduplicate",
+        help="Clusterize and align every distinct payload only once.",
+    ),
+    state_dir: str = typer.Option(
+        None,
+        "--state-dir",
+        help="Add the packets to the clusters and alignments saved in this folder by previous runs.",
+    ),
+    profile: str = typer.Option(
+        None,
+        "--profile",
+        help="Write the time, memory and counters of every stage to this JSON file.",
+    ),
+    cprofile: str = typer.Option(
+        None,
+        "--cprofile",
+        help="Also run cProfile and write its statistics to this file, readable by pstats or snakeviz.",
+    ),
 ):
-    header_length = header_length * 2 if header_length is not None else None
-    distance_type = {
-        Distance_Types.tlsh: TLSHDistance,
-        Distance_Types.ssdeep: SSDEEPDistance,
-        Distance_Types.hamming: HammingDistance,
-    }[distance_type]
-    cluster_type = {
-        Cluster_Types.optics: OpticsAlgorithm,
-        Cluster_Types.kmeans: KMeansAlgorithm,
-        Cluster_Types.kmeans_hierarchical: KMeansHierarchicalAlgorithm,
-    }[cluster_type]
+    distance_options = {"prune": prune}
+    if distance_type == Distance_Types.hamming:
+        distance_options = {
+            "mode": hamming_mode.value,
+            "length_penalty": length_penalty,
+        }
+    cluster_options = {}
+    if cluster_type == Cluster_Types.optics and n_neighbors is not None:
+        cluster_options = {"n_neighbors": n_neighbors}
+    if cluster_type == Cluster_Types.kmeans:
+        cluster_options = {"criterion": k_criterion.value}
+    if cluster_type == Cluster_Types.kmeans_hierarchical:
+        cluster_options = {
+            "max_depth": max_depth,
+            "min_cluster_size": min_cluster_size,
+            "criterion": k_criterion.value,
+        }
+    if cluster_type == Cluster_Types.kmedoids:
+        cluster_options = {"n_clusters": n_clusters}
+    distance_type = distance_algorithm(distance_type.value)
+    cluster_type = cluster_algorithm(cluster_type.value)
+    alignment_options = {}
+    if alignment_type == Alignment_Types.clustalo:
+        alignment_options = {"verbose": verbose, "guide_tree": guide_tree.value}
+    alignment_type = alignment_algorithm(alignment_type.value)
     pcap_name = os.path.basename(pcap)
     results_path = f"./results/{pcap_name}"
     os.makedirs(results_path, exist_ok=True)
 
+    # Imported here, so the options are parsed without loading the pipeline
+    from marissa.pipeline import Marissa
+    from marissa.profiling import Profiler
+
+    profiler = Profiler()
+    if profile or cprofile:
+        profiler.enable(cprofile=cprofile is not None)
+
     marissa_runner = Marissa(
         verbose=verbose,
         input_file=pcap,
@@ -111,9 +287,29 @@ def main(
         percent_equal=percent_equal,
         header_length=header_length,
         distance_algorithm=distance_type,
+        distance_options=distance_options,
         cluster_algorithm=cluster_type,
+        cluster_options=cluster_options,
+        alignment_algorithm=alignment_type,
+        alignment_options=alignment_options,
+        n_jobs=n_jobs,
+        threads=threads,
+        debug=debug,
+        sample_size=sample_size,
+        sample_strategy=sample_strategy.value,
+        batch_size=batch_size,
+        max_alignment_size=max_alignment_size,
+        cache_dir=cache_dir,
+        cache_size=cache_size << 20,
+        cache_distances=cache_distances,
+        deduplicate=deduplicate,
+        state_dir=state_dir,
     )
     marissa_runner.execute()
+    if profile:
+        profiler.save(profile)
+    if cprofile:
+        profiler.dump_cprofile(cprofile)
 
 
 if __name__ == "__main__":
@@ -1,13 +1,30 @@
-import binascii
+from functools import cached_property
 
 
 class Packet:
-    def __init__(self, packet) -> None:
-        self.hex = binascii.hexlify(bytes(packet)).decode("utf-8")
-        self.length = len(self.hex)
-        self.binary = binascii.unhexlify(self.hex)
-        self.ascii = binascii.unhexlify(self.hex).decode("utf-8", errors="ignore")
-        self.timestamp = float(packet.time)
+    def __init__(
+        self, data: bytes, timestamp: float = 0.0, header_length: int = 0
+    ) -> None:
+        self.data = data
+        self.length = len(data)
+        self.timestamp = timestamp
+        self.header_length = header_length
+
+    @property
+    def binary(self) -> bytes:
+        return bytes(self.data)
+
+    @property
+    def payload(self) -> memoryview:
+        return memoryview(self.data)[self.header_length :]
+
+    @cached_property
+    def hex(self) -> str:
+        return self.data.hex()
+
+    @cached_property
+    def ascii(self) -> str:
+        return self.binary.decode("utf-8", errors="ignore")
 
     def __str__(self):
         return self.hex
@@ -0,0 +1,81 @@
+from typing import Iterable, Iterator, Tuple
+
+import numpy as np
+
+from marissa.pcap import Packet
+
+# Link type of the packets when the capture doesn't specify it (Ethernet).
+DEFAULT_LINKTYPE = 1
+
+
+class PacketStore:
+    def __init__(
+        self,
+        buffer: bytes,
+        offsets: np.ndarray,
+        lengths: np.ndarray,
+        timestamps: np.ndarray,
+        linktype: int = None,
+    ) -> None:
+        """Packets stored in one contiguous byte buffer.
+
+        Every packet is described by its offset and length in the buffer, and
+        is accessed through zero-copy `memoryview` slices.
+
+        Args:
+            buffer (bytes): Bytes of every packet, one after another.
+            offsets (np.ndarray): Offset of every packet in the buffer.
+            lengths (np.ndarray): Length of every packet.
+            timestamps (np.ndarray): Timestamp of every packet.
+            linktype (int, optional): Link type of the packets. Defaults to Ethernet.
+        """
+        self.buffer = memoryview(buffer).toreadonly()
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.lengths = np.asarray(lengths, dtype=np.int64)
+        self.timestamps = np.asarray(timestamps, dtype=np.float64)
+        self.linktype = linktype if linktype is not None else DEFAULT_LINKTYPE
+        self.strip_header(0)
+
+    @classmethod
+    def from_packets(
+        cls, packets: Iterable[Tuple[float, bytes]], linktype: int = None
+    ) -> "PacketStore":
+        """Build a store from `(timestamp, bytes)` pairs, such as a PcapReader."""
+        buffer = bytearray()
+        offsets, lengths, timestamps = [], [], []
+        for timestamp, data in packets:
+            offsets.append(len(buffer))
+            lengths.append(len(data))
+            timestamps.append(timestamp)
+            buffer += data
+        return cls(buffer, offsets, lengths, timestamps, linktype)
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def __getitem__(self, index: int) -> memoryview:
+        """Get the payload of a packet, without its header."""
+        start = self.payload_offsets[index]
+        return self.buffer[start : start + self.payload_lengths[index]]
+
+    def __iter__(self) -> Iterator[memoryview]:
+        return (self[i] for i in range(len(self)))
+
+    def original(self, index: int) -> memoryview:
+        """Get the whole packet, including its header."""
+        start = self.offsets[index]
+        return self.buffer[start : start + self.lengths[index]]
+
+    def packet(self, index: int) -> Packet:
+        return Packet(self.original(index), self.timestamps[index], self.header_length)
+
+    def strip_header(self, header_length: int):
+        """Skip the first `header_length` bytes of the payload of every packet.
+
+        Args:
+            header_length (int): Length of the header.
+        """
+        self.header_length = header_length
+        header_lengths = np.minimum(header_length, self.lengths)
+        self.payload_offsets = self.offsets + header_lengths
+        self.payload_lengths = self.lengths - header_lengths
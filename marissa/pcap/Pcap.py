@@ -1,10 +1,35 @@
-import logging
+import struct
+from typing import Iterable, Tuple
 
-import scapy.all as scapy
+import numpy as np
 
-from marissa.pcap import Packet
+from marissa.pcap.PacketStore import DEFAULT_LINKTYPE, PacketStore
+from marissa.pcap.PcapReader import PcapReader
 
-logging.getLogger("scapy").setLevel(logging.CRITICAL)
+PCAP_HEADER = struct.Struct("<IHHiIII")
+PCAP_RECORD = struct.Struct("<IIII")
+PCAP_MAGIC = 0xA1B2C3D4
+SNAPLEN = 65535
+
+
+def write_pcap(
+    filename: str,
+    packets: Iterable[Tuple[float, bytes]],
+    linktype: int = DEFAULT_LINKTYPE,
+):
+    """Write packets to a pcap file.
+
+    Args:
+        filename (str): The file to write.
+        packets (Iterable[Tuple[float, bytes]]): Timestamp and data of every packet.
+        linktype (int, optional): Link type of the packets. Defaults to Ethernet.
+    """
+    with open(filename, "wb") as f:
+        f.write(PCAP_HEADER.pack(PCAP_MAGIC, 2, 4, 0, 0, SNAPLEN, linktype))
+        for timestamp, data in packets:
+            seconds, micros = divmod(round(timestamp * 1e6), 1_000_000)
+            f.write(PCAP_RECORD.pack(seconds, micros, len(data), len(data)))
+            f.write(data)
 
 
 class Pcap:
@@ -13,16 +38,33 @@ class Pcap:
         filename,
     ):
         self.filename = filename
-        self.content = []
+        self.content: PacketStore = None
 
-    def load(self) -> list[Packet]:
-        with open(self.filename, "rb") as f:
-            pcap = scapy.rdpcap(f)
-            for packet in pcap:
-                self.content.append(Packet(packet))
+    def load(self, min_length: int = None, max_length: int = None) -> PacketStore:
+        """Load the packets of the file.
 
+        Args:
+            min_length (int, optional): Minimum length of the packets. Defaults to None.
+            max_length (int, optional): Maximum length of the packets. Defaults to None.
+
+        Returns:
+            PacketStore: Packets with a length between `min_length` and `max_length`.
+        """
+        reader = PcapReader(self.filename, min_length, max_length)
+        self.content = PacketStore.from_packets(reader)
+        self.content.linktype = reader.linktype or self.content.linktype
         return self.content
 
-    def write(self, packets: list[str], filename: str):
-        packets = [bytes.fromhex(packet) for packet in packets]
-        scapy.wrpcap(filename, packets)
+    def write(self, packets: PacketStore, indices: np.ndarray, filename: str):
+        """Write some of the packets of a store to a pcap file.
+
+        Args:
+            packets (PacketStore): Store with the packets.
+            indices (np.ndarray): Indices of the packets to write.
+            filename (str): The file to write.
+        """
+        write_pcap(
+            filename,
+            ((packets.timestamps[i], packets.original(i)) for i in indices),
+            packets.linktype,
+        )
@@ -0,0 +1,154 @@
+import mmap
+import struct
+from typing import Iterator, Tuple
+
+# Classic pcap magic numbers, with their byte order and timestamp resolution.
+PCAP_MAGIC = {
+    b"\xd4\xc3\xb2\xa1": ("<", 1e-6),
+    b"\xa1\xb2\xc3\xd4": (">", 1e-6),
+    b"\x4d\x3c\xb2\xa1": ("<", 1e-9),
+    b"\xa1\xb2\x3c\x4d": (">", 1e-9),
+}
+PCAPNG_MAGIC = b"\x0a\x0d\x0d\x0a"
+PCAPNG_BYTE_ORDER_MAGIC = 0x1A2B3C4D
+
+# pcapng block types
+INTERFACE_DESCRIPTION_BLOCK = 1
+OBSOLETE_PACKET_BLOCK = 2
+SIMPLE_PACKET_BLOCK = 3
+ENHANCED_PACKET_BLOCK = 6
+IF_TSRESOL = 9
+
+
+class PcapReader:
+    def __init__(self, filename: str, min_length: int = None, max_length: int = None):
+        """Streaming reader for pcap and pcapng files.
+
+        The file is memory-mapped and parsed with `struct`, and only the packets
+        whose captured length is between `min_length` and `max_length` are copied.
+
+        Args:
+            filename (str): The file to read.
+            min_length (int, optional): Minimum length of the packets. Defaults to None.
+            max_length (int, optional): Maximum length of the packets. Defaults to None.
+        """
+        self.filename = filename
+        self.min_length = min_length if min_length is not None else 0
+        self.max_length = max_length if max_length is not None else float("inf")
+        self.linktype = None
+
+    def __iter__(self) -> Iterator[Tuple[float, bytes]]:
+        """Yield the `(timestamp, bytes)` of every packet of the file."""
+        with open(self.filename, "rb") as f:
+            try:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # Empty files can't be mapped
+                return
+            with data:
+                magic = data[:4]
+                if magic in PCAP_MAGIC:
+                    yield from self.read_pcap(data, *PCAP_MAGIC[magic])
+                elif magic == PCAPNG_MAGIC:
+                    yield from self.read_pcapng(data)
+                else:
+                    raise ValueError(f"{self.filename} is not a pcap or pcapng file")
+
+    def accept(self, length: int) -> bool:
+        """Check if a packet with the given captured length passes the filter."""
+        return self.min_length <= length <= self.max_length
+
+    def read_pcap(
+        self, data: mmap.mmap, endian: str, resolution: float
+    ) -> Iterator[Tuple[float, bytes]]:
+        """Read the records of a classic pcap file."""
+        (self.linktype,) = struct.unpack_from(f"{endian}I", data, 20)
+        record = struct.Struct(f"{endian}IIII")
+        offset = 24
+        size = len(data)
+        while offset + record.size <= size:
+            seconds, fraction, captured, _ = record.unpack_from(data, offset)
+            offset += record.size
+            if offset + captured > size:
+                break
+            if self.accept(captured):
+                yield seconds + fraction * resolution, data[offset : offset + captured]
+            offset += captured
+
+    def read_pcapng(self, data: mmap.mmap) -> Iterator[Tuple[float, bytes]]:
+        """Read the packet blocks of a pcapng file."""
+        endian = "<"
+        resolutions = []
+        offset = 0
+        size = len(data)
+        while offset + 12 <= size:
+            if data[offset : offset + 4] == PCAPNG_MAGIC:
+                # The byte order of every section is given by its header
+                (magic,) = struct.unpack_from("<I", data, offset + 8)
+                endian = "<" if magic == PCAPNG_BYTE_ORDER_MAGIC else ">"
+                resolutions = []
+            block_type, block_length = struct.unpack_from(f"{endian}II", data, offset)
+            if block_length < 12 or offset + block_length > size:
+                break
+            body = offset + 8
+            if block_type == INTERFACE_DESCRIPTION_BLOCK:
+                (linktype,) = struct.unpack_from(f"{endian}H", data, body)
+                if self.linktype is None:
+                    self.linktype = linktype
+                resolutions.append(
+                    self.read_resolution(
+                        data, endian, body + 8, offset + block_length - 4
+                    )
+                )
+            elif block_type == ENHANCED_PACKET_BLOCK:
+                interface, high, low, captured, _ = struct.unpack_from(
+                    f"{endian}IIIII", data, body
+                )
+                resolution = self.resolution(resolutions, interface)
+                if self.accept(captured):
+                    timestamp = ((high << 32) | low) * resolution
+                    yield timestamp, data[body + 20 : body + 20 + captured]
+            elif block_type == OBSOLETE_PACKET_BLOCK:
+                interface, _, high, low, captured, _ = struct.unpack_from(
+                    f"{endian}HHIIII", data, body
+                )
+                resolution = self.resolution(resolutions, interface)
+                if self.accept(captured):
+                    timestamp = ((high << 32) | low) * resolution
+                    yield timestamp, data[body + 20 : body + 20 + captured]
+            elif block_type == SIMPLE_PACKET_BLOCK:
+                (original,) = struct.unpack_from(f"{endian}I", data, body)
+                captured = min(original, block_length - 16)
+                if self.accept(captured):
+                    # Simple packet blocks have no timestamp
+                    yield 0.0, data[body + 4 : body + 4 + captured]
+            offset += block_length
+
+    def resolution(self, resolutions: list, interface: int) -> float:
+        """Get the timestamp resolution of the interface of a packet block.
+
+        Raises:
+            ValueError: The interface isn't described before the packet block.
+        """
+        if interface >= len(resolutions):
+            raise ValueError(
+                f"{self.filename} is a malformed pcapng file: a packet block refers "
+                f"to interface {interface}, which isn't described before it"
+            )
+        return resolutions[interface]
+
+    @staticmethod
+    def read_resolution(data: mmap.mmap, endian: str, offset: int, end: int) -> float:
+        """Read the timestamp resolution from the options of an interface block."""
+        option = struct.Struct(f"{endian}HH")
+        while offset + option.size <= end:
+            code, length = option.unpack_from(data, offset)
+            if code == 0:
+                break
+            if code == IF_TSRESOL:
+                value = data[offset + option.size]
+                if value & 0x80:
+                    return 2.0 ** -(value & 0x7F)
+                return 10.0**-value
+            offset += option.size + (length + 3) // 4 * 4
+        return 1e-6
@@ -1,2 +1,4 @@
 from .Packet import Packet
+from .PacketStore import PacketStore
 from .Pcap import Pcap
+from .PcapReader import PcapReader
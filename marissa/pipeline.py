@@ -0,0 +1,733 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from marissa.alignment import (
+    AlignmentAlgorithm,
+    AlignmentJob,
+    AlignmentScheduler,
+    ClustalOmega,
+    ColumnStatistics,
+)
+from marissa.cache import DEFAULT_CACHE_SIZE, DistanceCache, payload_keys
+from marissa.cluster_algorithm import ClusterAlgorithm
+from marissa.distance_metrics import DistanceAlgorithm
+from marissa.dna.encoder import to_fasta
+from marissa.Logger import Logger
+from marissa.pcap import Pcap
+from marissa.profiling import Profiler, profiled
+from marissa.state import ClusteringState, ClusterState
+
+# Quantile of the dissimilarities of the members of a cluster to its medoid
+# saved as its radius, so a few distant members don't widen it.
+RADIUS_QUANTILE = 0.95
+
+
+class Marissa:
+    """Main class for the Marissa tool."""
+
+    def __init__(
+        self,
+        verbose=False,
+        packet_length: int = None,
+        packet_length_variance: int = None,
+        percent_equal: int = 1,
+        input_file=None,
+        output_file=None,
+        header_length: int = None,
+        distance_algorithm: DistanceAlgorithm = None,
+        distance_options: dict = None,
+        cluster_algorithm: ClusterAlgorithm = None,
+        cluster_options: dict = None,
+        alignment_algorithm: AlignmentAlgorithm = None,
+        alignment_options: dict = None,
+        n_jobs: int = 1,
+        sample_size: int = 1000,
+        sample_strategy: str = "head",
+        batch_size: int = 10000,
+        max_alignment_size: int = None,
+        threads: int = None,
+        debug: bool = False,
+        cache_dir: str = None,
+        cache_size: int = DEFAULT_CACHE_SIZE,
+        cache_distances: bool = True,
+        deduplicate: bool = True,
+        state_dir: str = None,
+    ):
+        self.input_file = input_file
+        self.output_file = output_file
+        self.output_path = os.path.dirname(output_file)
+        self.max_length: int
+        self.verbose = verbose
+        self.packet_length = packet_length
+        self.packet_length_variance = packet_length_variance
+        self.percent_equal = percent_equal
+        self.header_length = header_length
+        self.clusters: int
+        self.logger = Logger(verbose)
+        self.profiler = Profiler()
+        self.pcap = Pcap(input_file)
+        self.distance_algorithm: DistanceAlgorithm = distance_algorithm(
+            **(distance_options or {})
+        )
+        self.cluster_algorithm: ClusterAlgorithm = cluster_algorithm
+        self.cluster_options = cluster_options or {}
+        if alignment_algorithm is None:
+            alignment_algorithm = ClustalOmega
+            alignment_options = {"verbose": verbose, **(alignment_options or {})}
+        self.alignment_algorithm: AlignmentAlgorithm = alignment_algorithm(
+            **(alignment_options or {})
+        )
+        self.n_jobs = n_jobs
+        self.sample_size = sample_size
+        self.sample_strategy = sample_strategy
+        self.batch_size = batch_size
+        self.max_alignment_size = max_alignment_size
+        self.threads = threads
+        self.debug = debug
+        self.deduplicate = deduplicate
+        self.cache = None
+        if cache_dir is not None:
+            self.cache = DistanceCache(cache_dir, cache_size, cache_distances)
+            self.distance_algorithm.cache = self.cache
+        self.state = None
+        if state_dir is not None:
+            self.state = ClusteringState.open(
+                state_dir, self.distance_algorithm, header_length
+            )
+        self.sequences: dict[str, list[bytes]] = {}
+        self.members: dict[str, pd.Index] = {}
+        # Row in the saved alignment of its cluster of every payload already in it
+        self.known: dict[int, int] = {}
+        # Cluster and positions of the payloads of every alignment batch
+        self.batches: dict[str, tuple] = {}
+        self.alignment_jobs: dict[str, AlignmentJob] = {}
+
+    @profiled()
+    def prepare(self):
+        """Prepare the data for the clustal test."""
+        self.load_data()
+        self.max_length = max(self.df["length"])
+        if self.header_length is not None:
+            self.remove_header()
+        self.remove_duplicates()
+        self.clusterize()
+        self.collect_sequences()
+
+    @profiled()
+    def load_data(self):
+        """Load data from input file and calculate necessary features.
+
+        Packets outside the length range are skipped by the reader.
+        """
+        self.logger.debug("Loading data from input file")
+        min_length, max_length = self.packet_length_range()
+        self.packets = self.pcap.load(min_length, max_length)
+        if self.packet_length is not None:
+            self.logger.info(
+                f"Loaded {len(self.packets)} packets with length between {min_length} and {max_length}"
+            )
+        else:
+            self.logger.info(f"Loaded {len(self.packets)} packets")
+        self.profiler.count("packets", len(self.packets))
+        self.df = pd.DataFrame({"length": self.packets.lengths})
+        self.df["id"] = self.df.index + 1
+
+    def packet_length_range(self) -> tuple[int, int]:
+        """Get the range of packet lengths to load, if packet_length is specified."""
+        if self.packet_length is None:
+            return None, None
+        variance = self.packet_length_variance or 0
+        return self.packet_length - variance, self.packet_length + variance
+
+    @profiled()
+    def remove_header(self):
+        """Skip the header of the packets if header_length is specified."""
+        if self.header_length is not None:
+            self.logger.debug("Removing header from data")
+            self.packets.strip_header(self.header_length)
+
+    @profiled()
+    def remove_duplicates(self):
+        """Map every packet to the first packet with the same payload.
+
+        Only these unique payloads are clusterized and aligned, and
+        `multiplicity` counts the packets every one of them stands for.
+        """
+        if self.deduplicate:
+            self.logger.debug("Removing duplicated payloads")
+            first = {}
+            self.df["unique"] = [
+                first.setdefault(bytes(packet), i)
+                for i, packet in enumerate(self.packets)
+            ]
+        else:
+            self.df["unique"] = self.df.index
+        self.unique = self.df.index[self.df["unique"] == self.df.index]
+        self.multiplicity = self.df["unique"].value_counts().reindex(self.unique)
+        self.profiler.count("unique payloads", len(self.unique))
+        if self.deduplicate:
+            self.logger.info(f"Found {len(self.unique)} unique payloads")
+
+    def sample_data(self, index: pd.Index = None) -> pd.Index:
+        """Select the unique payloads used to build the clusters.
+
+        Args:
+            index (pd.Index, optional): Packets to sample. Defaults to every unique payload.
+
+        Returns:
+            pd.Index: Index of the sampled packets, in capture order.
+        """
+        unique = self.df.loc[self.unique if index is None else index]
+        if not self.sample_size or len(unique) <= self.sample_size:
+            return unique.index
+        self.logger.debug(
+            f"Sampling {self.sample_size} packets ({self.sample_strategy})"
+        )
+        if self.sample_strategy == "head":
+            return unique.index[: self.sample_size]
+        if self.sample_strategy == "uniform":
+            sample = unique.sample(n=self.sample_size, random_state=0)
+            return sample.index.sort_values()
+        if self.sample_strategy == "stratified":
+            # Evenly spaced packets of the capture sorted by length keep the
+            # proportion of every length in the sample.
+            by_length = unique.sort_values("length", kind="stable").index
+            positions = np.linspace(0, len(by_length) - 1, self.sample_size)
+            return by_length[positions.round().astype(int)].sort_values()
+        raise ValueError(f"Unknown sample strategy: {self.sample_strategy}")
+
+    @profiled()
+    def clusterize(self):
+        """Clusterize the unique payloads, or add them to the saved clusters."""
+        nodes = pd.Series(self.calculate_nodes(), index=self.unique)
+        self.nodes = nodes
+        if self.state is not None and self.state.exists:
+            clusters = self.update_clusters(nodes)
+        else:
+            clusters, clusterizer, sample = self.cluster_packets(self.unique, nodes)
+            if self.state is not None:
+                medoids = clusterizer.calculate_medoids(list(clusters[sample]))
+                self.remember_clusters(
+                    {label: sample[i] for label, i in medoids.items()}, clusters, nodes
+                )
+        # Duplicated payloads go to the cluster of their unique payload
+        self.df["cluster"] = clusters.infer_objects()[self.df["unique"]].to_numpy()
+        self.clusters = self.df["cluster"].unique()
+        self.profiler.count("clusters", len(self.clusters))
+        self.logger.info(f"Clustering done. Found {len(self.clusters)} clusters")
+        self.df["id_cluster"] = self.df.groupby("cluster").cumcount()
+        # clusterizer.plot(self.df["cluster"])
+
+    @profiled()
+    def cluster_packets(self, index: pd.Index, nodes: pd.Series):
+        """Clusterize a sample of the packets and assign the rest to the nearest cluster.
+
+        Args:
+            index (pd.Index): Packets to clusterize.
+            nodes (pd.Series): Node of every unique payload.
+
+        Returns:
+            Tuple[pd.Series, ClusterAlgorithm, pd.Index]: Cluster of every packet,
+                the clusterizer and the sampled packets it clusterized.
+        """
+        sample = self.sample_data(index)
+        clusterizer = self.cluster_algorithm(
+            list(nodes[sample]),
+            self.distance_algorithm,
+            n_jobs=self.n_jobs,
+            **self.cluster_options,
+        )
+
+        self.logger.debug(f"Performing clustering of {len(sample)} packets...")
+        clusters = pd.Series(index=index, dtype=object)
+        if len(sample) < 2:
+            # Nothing to separate, and the clusterers need at least two points
+            clusters[sample] = 0
+        else:
+            with self.profiler.stage("perform_clustering"):
+                clusters[sample] = list(clusterizer.perform_clustering())
+        if len(sample) < len(index):
+            remaining = index.difference(sample)
+            clusters[remaining] = self.assign_to_clusters(
+                clusterizer, list(clusters[sample]), list(nodes[remaining])
+            )
+        return clusters, clusterizer, sample
+
+    @profiled()
+    def update_clusters(self, nodes: pd.Series) -> pd.Series:
+        """Add the packets to the saved clusters, and clusterize the outliers.
+
+        Payloads already in a saved alignment go back to its cluster. Every other
+        packet goes to the cluster of its nearest saved medoid, unless it's
+        farther from it than the radius of that cluster, or unrelated to every
+        medoid. Those outliers are clusterized into new clusters.
+
+        Args:
+            nodes (pd.Series): Node of every unique payload.
+
+        Returns:
+            pd.Series: Cluster of every unique payload.
+        """
+        attractors = {
+            label: cluster
+            for label, cluster in self.state.clusters.items()
+            if cluster.medoid is not None
+        }
+        clusters = pd.Series(index=self.unique, dtype=object)
+        known = self.state.known_payloads()
+        for i in self.unique:
+            match = known.get(self.packets[i].hex())
+            if match is not None:
+                clusters[i], self.known[i] = match
+        outliers = self.unique.difference(list(self.known))
+        if attractors and len(outliers):
+            self.logger.debug(
+                f"Assigning {len(outliers)} packets to {len(attractors)} saved clusters..."
+            )
+            medoid_nodes = self.distance_algorithm.calculate_nodes(
+                [bytes.fromhex(cluster.medoid) for cluster in attractors.values()]
+            )
+            nearest, dissimilarities = self.nearest_medoids(
+                list(nodes[outliers]), medoid_nodes
+            )
+            radii = np.array([cluster.radius for cluster in attractors.values()])
+            clusters[outliers] = np.array(list(attractors), dtype=object)[nearest]
+            outliers = outliers[
+                (dissimilarities > radii[nearest])
+                | self.distance_algorithm.unrelated(dissimilarities)
+            ]
+        for label, size in (
+            self.multiplicity.groupby(clusters.drop(outliers)).sum().items()
+        ):
+            self.state.clusters[label].size += int(size)
+
+        if len(outliers):
+            self.logger.info(f"Clusterizing {len(outliers)} outliers")
+            found, clusterizer, sample = self.cluster_packets(outliers, nodes)
+            like = next(iter(self.state.clusters), None)
+            relabel = {
+                label: label if label == -1 else self.state.new_label(like)
+                for label in found.unique()
+            }
+            found = found.map(relabel)
+            clusters[outliers] = found
+            medoids = clusterizer.calculate_medoids(list(clusters[sample]))
+            self.remember_clusters(
+                {label: sample[i] for label, i in medoids.items()}, found, nodes
+            )
+        return clusters
+
+    def remember_clusters(self, medoids: dict, clusters: pd.Series, nodes: pd.Series):
+        """Save the medoid, radius and size of new clusters in the state.
+
+        The radius is a quantile of the dissimilarities of the members to the
+        medoid, leaving out the unrelated ones, and 0 for singletons.
+
+        Args:
+            medoids (dict): Packet of the medoid of every cluster.
+            clusters (pd.Series): Cluster of every packet.
+            nodes (pd.Series): Node of every unique payload.
+        """
+        for label, medoid in medoids.items():
+            members = clusters.index[clusters == label]
+            # Labels are saved as JSON, so numpy integers are converted
+            label = label.item() if isinstance(label, np.generic) else label
+            size = int(self.multiplicity[members].sum())
+            if label in self.state.clusters:
+                # Noise is kept in a single cluster
+                self.state.clusters[label].size += size
+                continue
+            if label == -1:
+                self.state.clusters[label] = ClusterState(None, 0.0, size)
+                continue
+            _, dissimilarities = self.nearest_medoids(
+                list(nodes[members]), [nodes[medoid]]
+            )
+            # Unrelated members say nothing about the extent of the cluster
+            related = dissimilarities[
+                ~self.distance_algorithm.unrelated(dissimilarities)
+            ]
+            radius = (
+                float(np.quantile(related, RADIUS_QUANTILE)) if len(related) else 0.0
+            )
+            self.state.clusters[label] = ClusterState(
+                self.packets[medoid].hex(), radius, size
+            )
+        # New clusters are numbered after the top level labels already used
+        self.state.next_cluster = max(
+            [self.state.next_cluster]
+            + [int(str(label).split("s")[0]) + 1 for label in self.state.clusters]
+        )
+
+    @profiled()
+    def calculate_nodes(self) -> list:
+        """Calculate the node of every unique payload, reusing the cached ones."""
+        payloads = [self.packets[i] for i in self.unique]
+        if self.cache is None:
+            return self.distance_algorithm.calculate_nodes(payloads, self.n_jobs)
+        return self.cache.nodes(
+            self.distance_algorithm,
+            payload_keys(payloads),
+            payloads.__getitem__,
+            self.n_jobs,
+        )
+
+    def assign_to_clusters(
+        self, clusterizer: ClusterAlgorithm, clusters: list, nodes: list
+    ) -> list:
+        """Assign nodes to the cluster of the nearest medoid, in batches.
+
+        Args:
+            clusterizer (ClusterAlgorithm): Clusterizer fitted on the sample.
+            clusters (list): Cluster of every sampled node.
+            nodes (list): Nodes to assign.
+
+        Returns:
+            list: Cluster of every node.
+        """
+        medoids = clusterizer.calculate_medoids(clusters)
+        if len(medoids) > 1:
+            # Noise points are not a real cluster, so they can't attract packets.
+            medoids.pop(-1, None)
+        labels = np.array(list(medoids), dtype=object)
+        medoid_nodes = [clusterizer.data[i] for i in medoids.values()]
+        self.logger.debug(
+            f"Assigning {len(nodes)} packets to {len(medoids)} cluster medoids..."
+        )
+        nearest, _ = self.nearest_medoids(nodes, medoid_nodes)
+        return list(labels[nearest])
+
+    @profiled()
+    def nearest_medoids(self, nodes: list, medoid_nodes: list):
+        """Find the nearest medoid of every node, in batches.
+
+        Args:
+            nodes (list): Nodes.
+            medoid_nodes (list): Nodes of the medoids.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Position of the nearest medoid of every
+                node, and the dissimilarity to it.
+        """
+        nearest = np.empty(len(nodes), dtype=np.int64)
+        dissimilarities = np.empty(len(nodes))
+        for start in range(0, len(nodes), self.batch_size):
+            batch = self.distance_algorithm.to_dissimilarity(
+                self.distance_algorithm.cross_distance_matrix(
+                    nodes[start : start + self.batch_size], medoid_nodes
+                )
+            )
+            self.profiler.count("pairs compared", batch.size)
+            stop = start + len(batch)
+            nearest[start:stop] = batch.argmin(axis=1)
+            dissimilarities[start:stop] = batch[
+                np.arange(len(batch)), nearest[start:stop]
+            ]
+        return nearest, dissimilarities
+
+    @profiled()
+    def collect_sequences(self):
+        """Collect the unique payloads of every cluster missing from its saved alignment."""
+        for cluster_id, cluster_packets in self.df.loc[self.unique].groupby("cluster"):
+            index = cluster_packets.index
+            self.members[cluster_id] = index[~index.isin(list(self.known))]
+            self.sequences[cluster_id] = [
+                self.packets[i] for i in self.members[cluster_id]
+            ]
+            if self.debug:
+                # The payloads added to a saved alignment are numbered after its rows
+                self.write_debug_file(
+                    f"input.{cluster_id}.fasta",
+                    to_fasta(
+                        self.sequences[cluster_id], len(self.profile(cluster_id) or [])
+                    ),
+                )
+
+    def profile(self, cluster_id) -> list[str]:
+        """Get the saved alignment of a cluster, if any."""
+        if self.state is None or cluster_id not in self.state.clusters:
+            return None
+        return self.state.load_profile(cluster_id)
+
+    def write_debug_file(self, filename: str, content: str):
+        """Keep an intermediate file in the output path, in debug mode."""
+        with open(os.path.join(self.output_path, filename), "w") as f:
+            f.write(content)
+
+    @profiled()
+    def run(self):
+        """Align every cluster, in parallel.
+
+        Clusters larger than `max_alignment_size` are split into batches aligned
+        independently, and the alignments of the batches are merged afterwards.
+        """
+        self.batches = {}
+        for cluster_id in self.clusters:
+            chunks = self.split_cluster(cluster_id)
+            for i, positions in enumerate(chunks):
+                key = cluster_id if len(chunks) == 1 else f"{cluster_id}.{i}"
+                self.batches[key] = (cluster_id, positions)
+        scheduler = AlignmentScheduler(max_jobs=self.n_jobs, threads=self.threads)
+        batch_jobs = scheduler.run(
+            {key: len(positions) for key, (_, positions) in self.batches.items()},
+            self.align_batch,
+        )
+        split = {
+            cluster_id: [
+                key for key in self.batches if self.batches[key][0] == cluster_id
+            ]
+            for cluster_id in self.clusters
+            if cluster_id not in batch_jobs
+        }
+        self.alignment_jobs = {
+            cluster_id: batch_jobs[cluster_id]
+            for cluster_id in self.clusters
+            if cluster_id in batch_jobs
+        }
+        if split:
+            self.alignment_jobs.update(
+                scheduler.run(
+                    {
+                        cluster_id: len(self.sequences[cluster_id])
+                        for cluster_id in split
+                    },
+                    lambda job: self.merge_batches(
+                        job, [batch_jobs[key] for key in split[job.cluster_id]]
+                    ),
+                )
+            )
+        # Every batch, and the merge of every split cluster
+        for job in [*batch_jobs.values(), *(self.alignment_jobs[c] for c in split)]:
+            self.profiler.record(
+                "alignments",
+                cluster=str(job.cluster_id),
+                sequences=job.size,
+                columns=len(job.aligned[0]) // 2 if job.aligned else 0,
+                ok=job.ok,
+                seconds=job.duration,
+                timings=job.timings,
+            )
+        for job in self.alignment_jobs.values():
+            if job.aligned:
+                self.profiler.count("alignment columns", len(job.aligned[0]) // 2)
+
+    @profiled()
+    def split_cluster(self, cluster_id) -> list[np.ndarray]:
+        """Split the payloads of a cluster in batches of at most `max_alignment_size`.
+
+        The payloads are grouped around pivots chosen by farthest-first traversal,
+        one for every batch, so every batch holds similar payloads. Groups still
+        too large are cut in order of dissimilarity to their pivot.
+
+        Args:
+            cluster_id: Cluster to split.
+
+        Returns:
+            list[np.ndarray]: Positions of the payloads of every batch in the cluster.
+        """
+        n = len(self.sequences[cluster_id])
+        if not self.max_alignment_size or n <= self.max_alignment_size:
+            return [np.arange(n)]
+        nodes = list(self.nodes[self.members[cluster_id]])
+        n_batches = -(-n // self.max_alignment_size)
+        self.logger.debug(f"Splitting cluster {cluster_id} in {n_batches} batches")
+        pivots = [0]
+        # Dissimilarity of every payload to the pivot of its group
+        _, distance_to_pivot = self.nearest_medoids(nodes, [nodes[0]])
+        groups = np.zeros(n, dtype=np.int64)
+        while len(pivots) < n_batches and distance_to_pivot.max() > 0:
+            pivots.append(int(distance_to_pivot.argmax()))
+            _, dissimilarities = self.nearest_medoids(nodes, [nodes[pivots[-1]]])
+            closer = dissimilarities < distance_to_pivot
+            groups[closer] = len(pivots) - 1
+            distance_to_pivot[closer] = dissimilarities[closer]
+        chunks = []
+        for group in range(len(pivots)):
+            positions = np.flatnonzero(groups == group)
+            positions = positions[
+                np.argsort(distance_to_pivot[positions], kind="stable")
+            ]
+            chunks.extend(
+                np.sort(positions[start : start + self.max_alignment_size])
+                for start in range(0, len(positions), self.max_alignment_size)
+            )
+        return chunks
+
+    @profiled()
+    def align_batch(self, job: AlignmentJob):
+        """Align the unique payloads of a cluster, or of a batch of them."""
+        cluster_id, positions = self.batches[job.cluster_id]
+        self.logger.info(f"Aligning cluster {job.cluster_id}")
+        sequences = [self.sequences[cluster_id][i] for i in positions]
+        # The saved alignment is merged with the batches of a split cluster
+        profile = self.profile(cluster_id) if job.cluster_id == cluster_id else None
+        if not sequences:
+            # Every payload of the cluster is already in its saved alignment
+            job.aligned, job.returncode = profile or [], 0
+            return
+        distances = None
+        if self.alignment_algorithm.uses_distances and len(sequences) > 1:
+            # The guide tree is built from the digests already calculated
+            members = self.members[cluster_id][positions]
+            start = time.perf_counter()
+            distances = self.distance_algorithm.to_dissimilarity(
+                self.distance_algorithm.distance_matrix(
+                    list(self.nodes[members]), condensed=True
+                )
+            )
+            job.timings["distances"] = time.perf_counter() - start
+        self.alignment_algorithm.align(job, sequences, distances, profile)
+        if self.debug and job.stdout:
+            self.write_debug_file(f"output.{job.cluster_id}.clustal_num", job.stdout)
+
+    @profiled()
+    def merge_batches(self, job: AlignmentJob, batch_jobs: list[AlignmentJob]):
+        """Merge the alignments of the batches of a cluster, and its saved alignment.
+
+        Args:
+            job (AlignmentJob): Job of the cluster, filled with the merged alignment.
+            batch_jobs (list[AlignmentJob]): Jobs of its batches.
+        """
+        failed = [batch for batch in batch_jobs if not batch.ok]
+        if failed:
+            job.returncode = failed[0].returncode
+            job.stderr = f"Alignment of batch {failed[0].cluster_id} failed"
+            return
+        self.logger.info(
+            f"Merging {len(batch_jobs)} batches of cluster {job.cluster_id}"
+        )
+        profile = self.profile(job.cluster_id) or []
+        alignments = [batch.aligned for batch in batch_jobs]
+        start = time.perf_counter()
+        self.alignment_algorithm.merge_alignments(
+            job, [profile] + alignments if profile else alignments
+        )
+        job.timings["merge"] = time.perf_counter() - start
+        if job.ok:
+            # Back to the order of the payloads in the cluster
+            positions = np.concatenate(
+                [self.batches[batch.cluster_id][1] for batch in batch_jobs]
+            )
+            rows = job.aligned[len(profile) :]
+            job.aligned = job.aligned[: len(profile)] + [
+                rows[i] for i in np.argsort(positions)
+            ]
+
+    @profiled()
+    def post_run(self):
+        """Post run actions"""
+        self.decode_aligned_data()
+        if self.state is not None:
+            self.state.captures.append(self.input_file)
+            self.state.save()
+
+    def decode_aligned_data(self):
+        """Decode aligned data for each cluster, and copy it to the duplicated payloads."""
+        self.logger.debug("Decoding aligned data")
+        unique_clusters = self.df.loc[self.unique, "cluster"]
+        for cluster_id in self.clusters:
+            job = self.alignment_jobs[cluster_id]
+            representatives = unique_clusters.index[unique_clusters == cluster_id]
+            if job.ok:
+                # The rows of a saved alignment come first, then the new payloads
+                new = self.members[cluster_id]
+                rows = dict(
+                    zip(new, range(len(job.aligned) - len(new), len(job.aligned)))
+                )
+                rows.update(self.known)
+                data_aligned = [job.aligned[rows[i]] for i in representatives]
+                if self.state is not None and len(new):
+                    self.state.save_profile(cluster_id, job.aligned)
+            else:
+                self.logger.warning(f"Cluster {cluster_id} is left unaligned")
+                data_aligned = [self.packets[i].hex() for i in representatives]
+            aligned = pd.Series(data_aligned, index=representatives)
+            in_cluster = self.df["cluster"] == cluster_id
+            self.df.loc[in_cluster, "aligned"] = aligned[
+                self.df.loc[in_cluster, "unique"]
+            ].to_numpy()
+
+    @profiled()
+    def cleanup(self):
+        """Release the intermediate data"""
+        self.logger.debug("Cleaning up intermediate data")
+        self.sequences = {}
+        for job in self.alignment_jobs.values():
+            job.stdout = ""
+            job.aligned = []
+
+    @profiled()
+    def save(self):
+        """Save the results"""
+        self.save_results_to_file()
+        self.save_cluster_data_to_pcap()
+
+    def save_results_to_file(self):
+        """Save results to a file."""
+        self.logger.info("Saving results to file")
+        with open(self.output_file, "w") as f:
+            f.write(
+                f"File: {self.input_file} - Packets: {len(self.df)} - Max Length: {self.max_length}\n"
+            )
+            f.write(
+                f"Distance Algorithm: {self.distance_algorithm.__class__.__name__} - "
+            )
+            f.write(f"Cluster Algorithm: {self.cluster_algorithm.__qualname__}\n")
+            f.write(f"Clusters: {len(self.clusters)}\n")
+            f.write(
+                f"\n* if all packets are equal\n. if at least {self.percent_equal*100}% of the packets are equal\n\n"
+            )
+            for cluster_id, cluster_packets in self.df.groupby("cluster"):
+                self.write_cluster_data_to_file(f, cluster_id, cluster_packets)
+
+    def write_cluster_data_to_file(self, f, cluster_id, cluster_packets):
+        """Write data for a specific cluster to a file."""
+        f.write(f"CLUSTER {cluster_id}:\n")
+        id_length = max(len(str(x)) for x in cluster_packets["id_cluster"])
+        for i, packet in cluster_packets.iterrows():
+            f.write(
+                f"{str(packet['id_cluster']).zfill(id_length)}: {packet['aligned']}\n"
+            )
+        unique = cluster_packets[cluster_packets.index == cluster_packets["unique"]]
+        equals = self.print_align(unique["aligned"], self.multiplicity[unique.index])
+        f.write(f"{' '*(id_length+2)}{equals}\n\n")
+
+    def print_align(self, packets: list[str], weights: list[int] = None):
+        """Mark the columns where all, or at least percent_equal, of the packets are equal.
+
+        Args:
+            packets (list[str]): Aligned packets.
+            weights (list[int], optional): Number of packets every row stands for.
+                Defaults to 1.
+        """
+        statistics = ColumnStatistics(packets, weights)
+        equals = np.full(len(statistics), " ")
+        equals[statistics.majority_fraction >= self.percent_equal] = "."
+        equals[statistics.conserved] = "*"
+        return "".join(equals)
+
+    def column_statistics(self, cluster_id) -> ColumnStatistics:
+        """Get the statistics of every column of the alignment of a cluster."""
+        unique = self.df.loc[self.unique]
+        unique = unique[unique["cluster"] == cluster_id]
+        return ColumnStatistics(unique["aligned"], self.multiplicity[unique.index])
+
+    def save_cluster_data_to_pcap(self):
+        """Save data for each cluster to a pcap file."""
+        for cluster_id in self.clusters:
+            self.pcap.write(
+                self.packets,
+                self.df.index[self.df["cluster"] == cluster_id],
+                os.path.join(self.output_path, f"output.{cluster_id}.pcap"),
+            )
+
+    def execute(self):
+        """Execute the entire process."""
+        self.prepare()
+        self.run()
+        self.post_run()
+        self.cleanup()
+        self.save()
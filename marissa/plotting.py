@@ -0,0 +1,51 @@
+import numpy as np
+from sklearn.manifold import TSNE
+
+try:
+    from matplotlib import pyplot as plt
+    from matplotlib.patches import Patch
+except ImportError as error:
+    raise ImportError(
+        "Plotting needs matplotlib, install it with the plot extra: poetry install -E plot"
+    ) from error
+
+
+def plot_clusters(distances: np.ndarray, clusters: np.ndarray) -> None:
+    """Plot the clusters in a 2D space.
+
+    Args:
+        distances (np.ndarray): Distance matrix between the data points.
+        clusters (np.ndarray): Clusters to plot.
+    """
+    tsne = TSNE(n_components=2, random_state=0)
+    points = tsne.fit_transform(distances)
+    # Set figure size to be large, which should fill most screens.
+    fig, ax = plt.subplots(figsize=(16, 9))  # 16x9 aspect ratio, adjust as needed
+    # Convert clusters to unique integers
+    unique_clusters = list(set(clusters))
+    cluster_colors = [unique_clusters.index(cluster) for cluster in clusters]
+
+    # Normalize the cluster colors
+    norm = plt.Normalize(min(cluster_colors), max(cluster_colors))
+
+    ax.scatter(
+        points[:, 0],
+        points[:, 1],
+        c=cluster_colors,
+        s=50,
+        cmap="viridis",
+        norm=norm,
+    )
+
+    # Create a custom legend
+    legend_elements = [
+        Patch(facecolor=plt.cm.viridis(norm(i)), label=cluster)
+        for i, cluster in enumerate(unique_clusters)
+    ]
+    fig.legend(
+        handles=legend_elements,
+        title="Clusters",
+        loc="outside upper right",
+        # ncols=3,
+    )
+    plt.show()
@@ -0,0 +1,121 @@
+import cProfile
+import functools
+import json
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List
+
+from marissa.Logger import Singleton
+
+
+def peak_rss() -> int:
+    """Peak resident memory of the process so far, in bytes."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class Profiler(metaclass=Singleton):
+    def __init__(self):
+        """Time, memory and counters of the stages of the pipeline.
+
+        It does nothing until it's enabled, so the stages can always be
+        instrumented. Stages started inside another one are named after it,
+        like "prepare/clusterize", and repeated stages add up. Stages run by
+        worker threads, like the alignment of every cluster, start a new path
+        and can overlap, and their CPU time is the one of the whole process.
+        """
+        self.enabled = False
+        self.stages: Dict[str, dict] = {}
+        self.counters: Dict[str, int] = {}
+        self.records: Dict[str, List[dict]] = {}
+        self.cprofile: cProfile.Profile = None
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    def enable(self, cprofile: bool = False):
+        """Start profiling.
+
+        Args:
+            cprofile (bool, optional): Also run cProfile over every function
+                call, to save its statistics with `dump_cprofile`. Defaults to False.
+        """
+        self.enabled = True
+        self.start = time.perf_counter()
+        if cprofile:
+            self.cprofile = cProfile.Profile()
+            self.cprofile.enable()
+
+    @contextmanager
+    def stage(self, name: str):
+        """Measure the wall and CPU time of a stage, and the peak memory after it."""
+        if not self.enabled:
+            yield
+            return
+        stack = self.local.__dict__.setdefault("stack", [])
+        stack.append(name)
+        path = "/".join(stack)
+        start, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            wall, cpu = time.perf_counter() - start, time.process_time() - cpu
+            stack.pop()
+            with self.lock:
+                stage = self.stages.setdefault(
+                    path, {"calls": 0, "wall_seconds": 0.0, "cpu_seconds": 0.0}
+                )
+                stage["calls"] += 1
+                stage["wall_seconds"] += wall
+                stage["cpu_seconds"] += cpu
+                stage["peak_rss_bytes"] = peak_rss()
+
+    def count(self, name: str, n: int = 1):
+        """Add `n` to a counter, like the number of packets or pairs compared."""
+        if self.enabled:
+            with self.lock:
+                self.counters[name] = self.counters.get(name, 0) + int(n)
+
+    def record(self, kind: str, **fields):
+        """Keep the details of an item, like the timings of every alignment."""
+        if self.enabled:
+            with self.lock:
+                self.records.setdefault(kind, []).append(fields)
+
+    def report(self) -> dict:
+        return {
+            "wall_seconds": time.perf_counter() - self.start,
+            "peak_rss_bytes": peak_rss(),
+            "stages": self.stages,
+            "counters": self.counters,
+            **self.records,
+        }
+
+    def save(self, filename: str):
+        """Write the report as JSON."""
+        with open(filename, "w") as f:
+            json.dump(self.report(), f, indent=2, default=str)
+
+    def dump_cprofile(self, filename: str):
+        """Write the cProfile statistics, readable by pstats, snakeviz or flameprof."""
+        self.cprofile.disable()
+        self.cprofile.dump_stats(filename)
+
+
+def profiled(name: str = None):
+    """Measure every call of a function as a stage, named after it by default."""
+
+    def decorator(function):
+        stage = name or function.__name__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with Profiler().stage(stage):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,53 @@
+import importlib
+from typing import Dict
+
+# Classes of the algorithms selectable by name, as "module:class", so only the
+# backend that's used is imported.
+DISTANCE_ALGORITHMS: Dict[str, str] = {
+    "tlsh": "marissa.distance_metrics.tlsh_distance:TLSHDistance",
+    "ssdeep": "marissa.distance_metrics.ssdeep_distance:SSDEEPDistance",
+    "hamming": "marissa.distance_metrics.hamming_distance:HammingDistance",
+}
+CLUSTER_ALGORITHMS: Dict[str, str] = {
+    "optics": "marissa.cluster_algorithm.optics:OpticsAlgorithm",
+    "kmeans": "marissa.cluster_algorithm.k_means:KMeansAlgorithm",
+    "kmeans_hierarchical": "marissa.cluster_algorithm.k_means_hierarchical:KMeansHierarchicalAlgorithm",
+    "kmedoids": "marissa.cluster_algorithm.k_medoids:KMedoidsAlgorithm",
+}
+ALIGNMENT_ALGORITHMS: Dict[str, str] = {
+    "clustalo": "marissa.alignment.clustal_omega:ClustalOmega",
+    "native": "marissa.alignment.byte_aligner:ByteAligner",
+}
+
+
+def load(registry: Dict[str, str], name: str) -> type:
+    """Import the class of an algorithm.
+
+    Args:
+        registry (Dict[str, str]): Algorithms, by name.
+        name (str): Name of the algorithm.
+
+    Raises:
+        ValueError: The algorithm is not in the registry.
+
+    Returns:
+        type: Class of the algorithm.
+    """
+    if name not in registry:
+        raise ValueError(
+            f"Unknown algorithm {name!r}, expected one of {', '.join(registry)}"
+        )
+    module, cls = registry[name].split(":")
+    return getattr(importlib.import_module(module), cls)
+
+
+def distance_algorithm(name: str) -> type:
+    return load(DISTANCE_ALGORITHMS, name)
+
+
+def cluster_algorithm(name: str) -> type:
+    return load(CLUSTER_ALGORITHMS, name)
+
+
+def alignment_algorithm(name: str) -> type:
+    return load(ALIGNMENT_ALGORITHMS, name)
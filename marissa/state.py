@@ -0,0 +1,161 @@
+import json
+import os
+from typing import Dict, List, Optional
+
+from marissa.distance_metrics import DistanceAlgorithm
+
+STATE_FILE = "state.json"
+PROFILES_FOLDER = "profiles"
+
+
+class ClusterState:
+    def __init__(self, medoid: str, radius: float, size: int):
+        """Saved summary of a cluster.
+
+        Args:
+            medoid (str): Payload of the medoid, in hexadecimal.
+            radius (float): Quantile of the dissimilarities to the medoid of the
+                members that can be compared with it, `RADIUS_QUANTILE` in
+                `marissa.pipeline`, or 0 if there are none.
+            size (int): Number of packets seen in the cluster.
+        """
+        self.medoid = medoid
+        self.radius = radius
+        self.size = size
+
+
+class ClusteringState:
+    def __init__(self, directory: str, algorithm: dict, header_length: int = None):
+        """Clustering of the previous captures, to update it with new ones.
+
+        The clusters are saved in `state.json`, with the medoid and radius of
+        every one of them, and their alignments in the `profiles` folder, one
+        aligned payload per line, so new payloads can be added to them.
+
+        Args:
+            directory (str): Folder of the state.
+            algorithm (dict): Description of the distance algorithm, from `describe`.
+            header_length (int, optional): Length of the removed headers. Defaults to None.
+        """
+        self.directory = directory
+        self.algorithm = algorithm
+        self.header_length = header_length
+        self.clusters: Dict = {}
+        self.next_cluster = 0
+        self.captures: List[str] = []
+
+    @staticmethod
+    def describe(distance_algorithm: DistanceAlgorithm) -> dict:
+        """Describe a distance algorithm, to check that a state can be reused."""
+        return {
+            "name": type(distance_algorithm).__name__,
+            "version": distance_algorithm.version,
+            "options": distance_algorithm.cache_options(),
+        }
+
+    @property
+    def exists(self) -> bool:
+        return os.path.isfile(os.path.join(self.directory, STATE_FILE))
+
+    @classmethod
+    def open(
+        cls,
+        directory: str,
+        distance_algorithm: DistanceAlgorithm,
+        header_length: int = None,
+    ) -> "ClusteringState":
+        """Load the state of a folder, or start an empty one.
+
+        Args:
+            directory (str): Folder of the state.
+            distance_algorithm (DistanceAlgorithm): Algorithm of this run.
+            header_length (int, optional): Length of the removed headers. Defaults to None.
+
+        Raises:
+            ValueError: The state was built with another distance algorithm or
+                header length.
+
+        Returns:
+            ClusteringState: The state.
+        """
+        state = cls(directory, cls.describe(distance_algorithm), header_length)
+        if not state.exists:
+            return state
+        with open(os.path.join(directory, STATE_FILE)) as f:
+            saved = json.load(f)
+        if saved["algorithm"] != state.algorithm:
+            raise ValueError(
+                f"The state in {directory} was built with {saved['algorithm']}"
+            )
+        if saved["header_length"] != header_length:
+            raise ValueError(
+                f"The state in {directory} was built with a header length of "
+                f"{saved['header_length']}"
+            )
+        state.next_cluster = saved["next_cluster"]
+        state.captures = saved["captures"]
+        # JSON objects only have string keys, so the labels are kept in a list
+        state.clusters = {
+            cluster.pop("label"): ClusterState(**cluster)
+            for cluster in saved["clusters"]
+        }
+        return state
+
+    def save(self):
+        os.makedirs(os.path.join(self.directory, PROFILES_FOLDER), exist_ok=True)
+        saved = {
+            "algorithm": self.algorithm,
+            "header_length": self.header_length,
+            "next_cluster": self.next_cluster,
+            "captures": self.captures,
+            "clusters": [
+                {"label": label, **vars(cluster)}
+                for label, cluster in self.clusters.items()
+            ],
+        }
+        temporary = os.path.join(self.directory, f"{STATE_FILE}.tmp")
+        with open(temporary, "w") as f:
+            json.dump(saved, f, indent=2)
+        os.replace(temporary, os.path.join(self.directory, STATE_FILE))
+
+    def new_label(self, like=None):
+        """Get an unused cluster label, of the same type as the existing ones."""
+        label = self.next_cluster
+        self.next_cluster += 1
+        return str(label) if isinstance(like, str) else label
+
+    def profile_file(self, label) -> str:
+        return os.path.join(self.directory, PROFILES_FOLDER, f"{label}.txt")
+
+    def load_profile(self, label) -> Optional[List[str]]:
+        """Get the aligned payloads of a cluster, if it has a saved alignment."""
+        if not os.path.isfile(self.profile_file(label)):
+            return None
+        with open(self.profile_file(label)) as f:
+            return f.read().split()
+
+    def known_payloads(self) -> Dict[str, tuple]:
+        """Find the payloads already in the saved alignments.
+
+        Returns:
+            Dict[str, tuple]: Label of the cluster and row in its alignment of
+                every payload, in hexadecimal.
+        """
+        known = {}
+        for label in self.clusters:
+            for row, aligned in enumerate(self.load_profile(label) or []):
+                known.setdefault(aligned.replace("-", ""), (label, row))
+        return known
+
+    def save_profile(self, label, aligned: List[str]):
+        """Save the alignment of a cluster.
+
+        Args:
+            label: Label of the cluster.
+            aligned (List[str]): Aligned payloads, in hexadecimal with "--" gaps.
+        """
+        os.makedirs(os.path.join(self.directory, PROFILES_FOLDER), exist_ok=True)
+        filename = self.profile_file(label)
+        with open(f"{filename}.tmp", "w") as f:
+            f.writelines(f"{row}\n" for row in aligned)
+        os.replace(f"{filename}.tmp", filename)
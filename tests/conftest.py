@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+from marissa.pcap.Pcap import write_pcap
+
+
+def message_payloads(n_types: int, n_packets: int, seed: int = 0) -> list:
+    """Payloads of a few message types, a constant header and a random body each."""
+    rng = np.random.default_rng(seed)
+    headers = [rng.bytes(16) for _ in range(n_types)]
+    lengths = rng.integers(64, 160, size=n_types)
+    payloads = []
+    for i in range(n_packets):
+        message_type = i % n_types
+        payloads.append(
+            headers[message_type]
+            + bytes([message_type]) * 32
+            + rng.bytes(int(lengths[message_type]))
+        )
+    return payloads
+
+
+@pytest.fixture
+def write_capture(tmp_path):
+    """Write payloads as the packets of a capture, and return its filename."""
+
+    def write(payloads: list, name: str = "capture.pcap") -> str:
+        filename = str(tmp_path / name)
+        write_pcap(filename, enumerate(payloads))
+        return filename
+
+    return write
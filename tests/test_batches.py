@@ -0,0 +1,82 @@
+import os
+
+import pytest
+from conftest import message_payloads
+
+from marissa import Marissa
+from marissa.alignment import ByteAligner
+from marissa.cluster_algorithm import KMedoidsAlgorithm, OpticsAlgorithm
+from marissa.distance_metrics import HammingDistance, TLSHDistance
+
+ALGORITHMS = {
+    "tlsh-kmedoids": (TLSHDistance, KMedoidsAlgorithm, {"n_clusters": 3}),
+    "hamming-optics": (HammingDistance, OpticsAlgorithm, {}),
+}
+
+
+def run(capture: str, output_dir: str, algorithms: tuple, **options) -> Marissa:
+    distance_algorithm, cluster_algorithm, cluster_options = algorithms
+    os.makedirs(output_dir, exist_ok=True)
+    marissa = Marissa(
+        input_file=capture,
+        output_file=os.path.join(output_dir, "output.txt"),
+        distance_algorithm=distance_algorithm,
+        cluster_algorithm=cluster_algorithm,
+        cluster_options=cluster_options,
+        alignment_algorithm=ByteAligner,
+        max_alignment_size=7,
+        **options,
+    )
+    marissa.execute()
+    return marissa
+
+
+def assert_split(marissa: Marissa):
+    assert any(key != cluster_id for key, (cluster_id, _) in marissa.batches.items())
+
+
+def assert_rows_match_payloads(marissa: Marissa, payloads: list):
+    # Every aligned row is the payload of its own packet
+    assert [row.replace("--", "") for row in marissa.df["aligned"]] == [
+        payload.hex() for payload in payloads
+    ]
+    widths = marissa.df["aligned"].str.len().groupby(marissa.df["cluster"])
+    assert (widths.nunique() == 1).all()
+
+
+@pytest.mark.parametrize("algorithms", ALGORITHMS.values(), ids=ALGORITHMS)
+def test_split_clusters_keep_every_row_with_its_payload(
+    tmp_path, write_capture, algorithms
+):
+    # With duplicates, which are aligned once and copied to every packet
+    payloads = message_payloads(3, 60)
+    payloads += payloads[::5]
+
+    marissa = run(write_capture(payloads), str(tmp_path / "results"), algorithms)
+
+    assert_split(marissa)
+    assert_rows_match_payloads(marissa, payloads)
+
+
+@pytest.mark.parametrize("algorithms", ALGORITHMS.values(), ids=ALGORITHMS)
+def test_split_clusters_are_merged_after_their_saved_alignment(
+    tmp_path, write_capture, algorithms
+):
+    payloads = message_payloads(3, 60)
+    state_dir = str(tmp_path / "state")
+    run(
+        write_capture(payloads[:30], "first.pcap"),
+        str(tmp_path / "first"),
+        algorithms,
+        state_dir=state_dir,
+    )
+
+    second = run(
+        write_capture(payloads, "second.pcap"),
+        str(tmp_path / "second"),
+        algorithms,
+        state_dir=state_dir,
+    )
+
+    assert_split(second)
+    assert_rows_match_payloads(second, payloads)
@@ -0,0 +1,57 @@
+import numpy as np
+
+from marissa.alignment import AlignmentJob, ByteAligner
+from marissa.alignment.byte_aligner import GAP, from_hex, to_hex
+
+
+def align(sequences: list, profile: list = None) -> list:
+    job = AlignmentJob(0, len(sequences))
+    ByteAligner().align(job, sequences, profile=profile)
+    assert job.ok
+    return job.aligned
+
+
+def test_identical_payloads_align_without_gaps():
+    payload = bytes(range(40))
+
+    assert align([payload] * 3) == [payload.hex()] * 3
+
+
+def test_an_insertion_adds_a_single_gap_column():
+    payload = b"GET /index.html HTTP/1.1"
+    inserted = payload[:4] + b"!" + payload[4:]
+
+    aligned = align([payload, inserted])
+
+    assert aligned == [payload[:4].hex() + "--" + payload[4:].hex(), inserted.hex()]
+
+
+def test_hex_rows_round_trip_through_the_byte_matrix():
+    rows = ["4d52--0010", "4d52ff--10", "----ff00ff"]
+
+    matrix = from_hex(rows)
+
+    np.testing.assert_array_equal(
+        matrix,
+        [
+            [0x4D, 0x52, GAP, 0x00, 0x10],
+            [0x4D, 0x52, 0xFF, GAP, 0x10],
+            [GAP, GAP, 0xFF, 0x00, 0xFF],
+        ],
+    )
+    assert to_hex(matrix) == rows
+
+
+def test_profile_rows_come_first_and_keep_their_bytes():
+    profile = ["4d52--0010", "4d52ff0010"]
+    payloads = [bytes.fromhex("4d52ff0010"), bytes.fromhex("4d520010")]
+
+    aligned = align(payloads, profile=profile)
+
+    assert len(aligned) == 4
+    assert len({len(row) for row in aligned}) == 1
+    ungapped = [row.replace("--", "") for row in aligned]
+    assert ungapped == ["4d520010", "4d52ff0010", "4d52ff0010", "4d520010"]
+    # Without the columns inserted for the payloads, the profile is unchanged
+    saved = from_hex(aligned[:2])
+    assert to_hex(saved[:, (saved != GAP).any(axis=0)]) == profile
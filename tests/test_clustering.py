@@ -0,0 +1,53 @@
+import os
+
+from conftest import message_payloads
+
+from marissa import Marissa
+from marissa.alignment import ByteAligner
+from marissa.cluster_algorithm import OpticsAlgorithm
+from marissa.distance_metrics import TLSHDistance
+
+
+def run(capture: str, output_dir: str, **options) -> Marissa:
+    os.makedirs(output_dir, exist_ok=True)
+    marissa = Marissa(
+        input_file=capture,
+        output_file=os.path.join(output_dir, "output.txt"),
+        distance_algorithm=TLSHDistance,
+        cluster_algorithm=OpticsAlgorithm,
+        alignment_algorithm=ByteAligner,
+        **options,
+    )
+    marissa.execute()
+    return marissa
+
+
+def test_identical_payloads_form_one_cluster(tmp_path, write_capture):
+    # Deduplicated, a capture of keepalives leaves a single payload
+    capture = write_capture([b"keepalive " * 10] * 20)
+
+    marissa = run(capture, str(tmp_path / "results"))
+
+    assert len(marissa.unique) == 1
+    assert len(marissa.clusters) == 1
+    assert set(marissa.df["aligned"]) == {(b"keepalive " * 10).hex()}
+
+
+def test_single_outlier_forms_a_new_cluster(tmp_path, write_capture):
+    state_dir = str(tmp_path / "state")
+    payloads = message_payloads(2, 40)
+    run(
+        write_capture(payloads, "first.pcap"),
+        str(tmp_path / "first"),
+        state_dir=state_dir,
+    )
+
+    # Too short for TLSH, so unrelated to every saved cluster
+    second = run(
+        write_capture(payloads + [b"ping"], "second.pcap"),
+        str(tmp_path / "second"),
+        state_dir=state_dir,
+    )
+
+    outlier = second.df["cluster"].iloc[-1]
+    assert (second.df["cluster"] == outlier).sum() == 1
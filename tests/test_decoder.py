@@ -0,0 +1,37 @@
+import glob
+import os
+
+import pytest
+
+from marissa.dna.decoder import decode, decode_sequences, read_file
+from marissa.dna.encoder import to_aligned_dna_sequence
+
+# Clustal alignments, with the payloads expected from every one of them.
+FIXTURES = sorted(
+    glob.glob(
+        os.path.join(os.path.dirname(__file__), "data", "decoder", "*.clustal_num")
+    )
+)
+
+
+@pytest.mark.parametrize("clustal", FIXTURES, ids=os.path.basename)
+def test_decode_clustal_output(clustal):
+    with open(clustal.replace(".clustal_num", ".expected")) as f:
+        expected = f.read().split()
+
+    assert decode(read_file(clustal)) == expected
+
+
+def test_decoded_rows_have_no_gap_only_columns():
+    # The last byte of every row is split across the last groups of columns
+    aligned = decode_sequences(["TAATAA--GG", "TAAT--AAGG"])
+
+    assert aligned == ["410a", "410a"]
+
+
+def test_aligned_payloads_round_trip():
+    aligned = ["4d52--0010", "4d52ff--10", "----ff0010"]
+
+    assert (
+        decode_sequences([to_aligned_dna_sequence(row) for row in aligned]) == aligned
+    )
@@ -0,0 +1,32 @@
+import re
+
+import numpy as np
+import pytest
+
+from marissa.alignment import ClustalOmega
+from marissa.dna.encoder import to_fasta
+
+
+def fasta_names(fasta: str) -> list:
+    return [line[1:] for line in fasta.splitlines() if line.startswith(">")]
+
+
+@pytest.mark.parametrize("start", [0, 5, 95])
+def test_guide_tree_names_match_fasta(tmp_path, start):
+    n = 12
+    sequences = [bytes([i]) * 8 for i in range(n)]
+    distances = np.random.default_rng(0).random(n * (n - 1) // 2)
+    names = fasta_names(to_fasta(sequences, start))
+
+    _, distmat = ClustalOmega(guide_tree="distances").write_guide_tree(
+        str(tmp_path), distances, start
+    )
+    with open(distmat) as f:
+        rows = f.read().splitlines()[1:]
+    assert [row.split()[0] for row in rows] == names
+
+    _, guide_tree = ClustalOmega(guide_tree="tree").write_guide_tree(
+        str(tmp_path), distances, start
+    )
+    with open(guide_tree) as f:
+        assert sorted(re.findall(r"MSG\.\d+", f.read())) == sorted(names)
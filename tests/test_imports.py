@@ -0,0 +1,47 @@
+import os
+import subprocess
+import sys
+
+# The CLI used to import every backend and took about 3 seconds to start.
+IMPORT_TIME_BUDGET = 1.0
+# Backends only imported when an algorithm using them is selected.
+HEAVY_MODULES = ("pandas", "scipy", "sklearn", "scapy", "matplotlib", "tlsh", "ssdeep")
+
+
+def python(code: str, *options: str) -> subprocess.CompletedProcess:
+    """Run code in a fresh interpreter, where nothing is imported yet."""
+    return subprocess.run(
+        [sys.executable, *options, "-c", code],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def test_import_time():
+    stderr = python("import marissa.main", "-X", "importtime").stderr
+    # Lines of -X importtime: "import time: self [us] | cumulative | package"
+    cumulative = {
+        line.split("|")[2].strip(): int(line.split("|")[1])
+        for line in stderr.splitlines()
+        if line.startswith("import time:") and line.split("|")[1].strip().isdigit()
+    }
+    assert cumulative["marissa.main"] / 1e6 < IMPORT_TIME_BUDGET
+
+
+def test_import_leaves_backends_unloaded():
+    loaded = python(
+        "import sys, marissa, marissa.main, marissa.registry\n"
+        f"print(' '.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    ).stdout.split()
+    assert loaded == []
+
+
+def test_exports_and_their_modules_are_both_importable():
+    output = python(
+        "import marissa.pipeline as pipeline\n"
+        "from marissa import Marissa\n"
+        "print(type(pipeline).__name__, Marissa.__module__, Marissa is pipeline.Marissa)"
+    ).stdout.split()
+    assert output == ["module", "marissa.pipeline", "True"]
@@ -0,0 +1,18 @@
+import numpy as np
+import pytest
+from sklearn.datasets import make_blobs
+
+from marissa.cluster_algorithm import KMeansModelSelection
+
+
+@pytest.mark.parametrize("seed", [2, 4])
+def test_jobs_do_not_change_the_clusters(seed):
+    features, _ = make_blobs(n_samples=300, centers=5, random_state=seed)
+
+    serial = KMeansModelSelection(n_jobs=1).fit(features)
+    parallel = KMeansModelSelection(n_jobs=4).fit(features)
+
+    assert serial.n_clusters == parallel.n_clusters
+    for k, model in serial.models.items():
+        assert model.inertia_ == parallel.models[k].inertia_
+    np.testing.assert_array_equal(serial.labels(), parallel.labels())
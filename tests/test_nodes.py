@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+
+from marissa import distance_metrics
+from marissa.distance_metrics import distance_matrix
+
+# Distance algorithms hashing the payloads, and the binding each one needs.
+HASHES = {"TLSHDistance": "tlsh", "SSDEEPDistance": "ssdeep"}
+
+
+@pytest.mark.parametrize("name", HASHES)
+def test_nodes_in_worker_processes_match_the_loop(monkeypatch, name):
+    # The classes are imported lazily, so a missing binding only skips its test
+    pytest.importorskip(HASHES[name])
+    algorithm = getattr(distance_metrics, name)()
+    rng = np.random.default_rng(0)
+    buffer = rng.bytes(200 * 300)
+    # Views of a capture, like the payloads of a PacketStore
+    payloads = [
+        memoryview(buffer)[i * 200 : i * 200 + 100 + i % 100] for i in range(300)
+    ]
+    monkeypatch.setattr(distance_matrix, "MIN_PARALLEL_NODES", 100)
+    monkeypatch.setattr(distance_matrix, "NODES_CHUNK_SIZE", 64)
+
+    parallel = algorithm.calculate_nodes(payloads, n_jobs=2)
+
+    assert parallel == [algorithm.calculate_node(payload) for payload in payloads]
@@ -0,0 +1,51 @@
+import struct
+
+import pytest
+
+from marissa.pcap import PcapReader
+from marissa.pcap.PcapReader import (
+    ENHANCED_PACKET_BLOCK,
+    INTERFACE_DESCRIPTION_BLOCK,
+    PCAPNG_BYTE_ORDER_MAGIC,
+    PCAPNG_MAGIC,
+)
+
+
+def block(block_type: int, body: bytes) -> bytes:
+    body += b"\0" * (-len(body) % 4)
+    length = len(body) + 12
+    return struct.pack("<II", block_type, length) + body + struct.pack("<I", length)
+
+
+SECTION_HEADER = (
+    PCAPNG_MAGIC
+    + struct.pack("<I", 28)
+    + struct.pack("<IHHq", PCAPNG_BYTE_ORDER_MAGIC, 1, 0, -1)
+    + struct.pack("<I", 28)
+)
+INTERFACE = block(INTERFACE_DESCRIPTION_BLOCK, struct.pack("<HHI", 1, 0, 65535))
+PACKET = block(
+    ENHANCED_PACKET_BLOCK, struct.pack("<IIIII", 0, 0, 1_500_000, 4, 4) + b"ping"
+)
+
+
+def write(tmp_path, *blocks: bytes) -> str:
+    filename = str(tmp_path / "capture.pcapng")
+    with open(filename, "wb") as f:
+        f.write(SECTION_HEADER + b"".join(blocks))
+    return filename
+
+
+def test_read_enhanced_packet_blocks(tmp_path):
+    reader = PcapReader(write(tmp_path, INTERFACE, PACKET))
+
+    assert [(timestamp, bytes(data)) for timestamp, data in reader] == [(1.5, b"ping")]
+    assert reader.linktype == 1
+
+
+@pytest.mark.parametrize("min_length", [None, 100])
+def test_packet_block_before_its_interface_is_rejected(tmp_path, min_length):
+    filename = write(tmp_path, PACKET, INTERFACE)
+
+    with pytest.raises(ValueError, match="malformed pcapng"):
+        list(PcapReader(filename, min_length=min_length))
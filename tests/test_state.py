@@ -0,0 +1,55 @@
+import json
+import os
+
+from conftest import message_payloads
+
+from marissa import Marissa
+from marissa.alignment import ByteAligner
+from marissa.cluster_algorithm import KMedoidsAlgorithm
+from marissa.distance_metrics import TLSHDistance
+from marissa.state import PROFILES_FOLDER, STATE_FILE
+
+
+def run(capture: str, state_dir: str, output_dir: str) -> Marissa:
+    os.makedirs(output_dir, exist_ok=True)
+    marissa = Marissa(
+        input_file=capture,
+        output_file=os.path.join(output_dir, "output.txt"),
+        distance_algorithm=TLSHDistance,
+        cluster_algorithm=KMedoidsAlgorithm,
+        cluster_options={"n_clusters": 3},
+        alignment_algorithm=ByteAligner,
+        state_dir=state_dir,
+    )
+    marissa.execute()
+    return marissa
+
+
+def saved_clusters(state_dir: str) -> dict:
+    with open(os.path.join(state_dir, STATE_FILE)) as f:
+        clusters = {cluster["label"]: cluster for cluster in json.load(f)["clusters"]}
+    for label, cluster in clusters.items():
+        with open(os.path.join(state_dir, PROFILES_FOLDER, f"{label}.txt")) as f:
+            cluster["profile"] = f.read().split()
+    return clusters
+
+
+def test_rerun_same_capture_keeps_clusters(tmp_path, write_capture):
+    # Payloads too short for TLSH are unrelated to every other one
+    payloads = message_payloads(3, 60) + [b"ping", b"pong"]
+    capture = write_capture(payloads)
+    state_dir = str(tmp_path / "state")
+
+    first = run(capture, state_dir, str(tmp_path / "first"))
+    before = saved_clusters(state_dir)
+    second = run(capture, state_dir, str(tmp_path / "second"))
+    after = saved_clusters(state_dir)
+
+    assert list(second.df["cluster"]) == list(first.df["cluster"])
+    assert list(second.df["aligned"]) == list(first.df["aligned"])
+    assert after.keys() == before.keys()
+    for label, cluster in after.items():
+        # Payloads already in the alignments are not added again
+        assert cluster["profile"] == before[label]["profile"]
+        assert cluster["size"] == 2 * before[label]["size"]
+        assert cluster["radius"] < TLSHDistance.unrelated_distance
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+import tlsh
+
+from marissa.distance_metrics import TLSHDistance
+from marissa.distance_metrics.tlsh_distance import MAX_DISTANCE
+
+
+def digests(n: int, seed: int = 0) -> list:
+    """Digests of random payloads of very different lengths, and a few too short for TLSH."""
+    rng = np.random.default_rng(seed)
+    payloads = [rng.bytes(int(length)) for length in rng.integers(60, 4000, size=n)]
+    return [tlsh.hash(payload) for payload in payloads + [b"short"] * 3]
+
+
+def length_value(digest: str) -> int:
+    if digest == "TNULL":
+        return -1
+    parsed = tlsh.Tlsh()
+    parsed.fromTlshStr(digest)
+    return parsed.lvalue
+
+
+def pruned(algorithm: TLSHDistance, data: list) -> np.ndarray:
+    """Diff of every pair, or the maximum for the pairs in distant length buckets."""
+    expected = np.full((len(data), len(data)), float(MAX_DISTANCE))
+    buckets = algorithm.length_buckets(np.array([length_value(d) for d in data]))
+    for i, a in enumerate(data):
+        for j, b in enumerate(data):
+            same = any(grid[i] == grid[j] for grid in buckets)
+            if i == j:
+                expected[i, j] = algorithm.self_distance
+            elif a != "TNULL" and b != "TNULL" and same:
+                expected[i, j] = tlsh.diff(a, b)
+    return expected
+
+
+@pytest.mark.parametrize("prune", [True, False])
+def test_distance_matrix_matches_tlsh_diff(prune):
+    data = digests(60)
+    algorithm = TLSHDistance(prune=prune, length_window=2)
+
+    distances = algorithm.calculate_distance_matrix(data)
+
+    if prune:
+        # Only a few pairs share a length bucket
+        assert len(algorithm.candidate_pairs(data)[0]) < len(data) ** 2 / 4
+        expected = pruned(algorithm, data)
+    else:
+        expected = algorithm.cross_distance_matrix(data, data)
+        np.fill_diagonal(expected, algorithm.self_distance)
+        valid = [digest != "TNULL" for digest in data]
+        for i in np.flatnonzero(valid)[:10]:
+            for j in np.flatnonzero(valid)[:10]:
+                if i != j:
+                    assert expected[i, j] == tlsh.diff(data[i], data[j])
+    np.testing.assert_array_equal(distances, expected)
+    np.testing.assert_array_equal(
+        algorithm.calculate_distance_matrix(data, condensed=True),
+        expected[np.triu_indices(len(data), 1)],
+    )